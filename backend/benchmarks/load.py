@@ -0,0 +1,433 @@
+#!/usr/bin/env python3
+"""Concurrent load and latency benchmark for the API.
+
+Boots the server.py app in-process against a local mongod (--mongo-url) or,
+by default, an in-memory mongomock-motor database, seeds users with tasks
+and time entries, then drives concurrent traffic across auth, tasks, time
+entries and the dashboard. Logins go through /auth/callback against a local
+stub of the auth provider, pointed to with EMERGENT_AUTH_URL. Reports p50/p95/p99 latency per operation,
+throughput and Mongo operations per request, and saves everything as JSON.
+
+Mongo operations per request are measured in a sequential calibration pass
+before the load phase, so concurrent requests cannot blur the attribution.
+With mongod they are the driver's commands; with mongomock they are
+collection method calls.
+
+Usage:
+  python benchmarks/load.py [--users 50] [--tasks-per-user 200] [--entries-per-user 200]
+                            [--concurrency 20] [--requests 2000] [--mongo-url URL]
+                            [--output results.json] [--compare baseline.json]
+                            [--profile] [--profile-log query_profile.log]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Operation name -> relative weight in the traffic mix
+OPERATION_MIX = {
+    "auth_callback": 5,
+    "auth_me": 10,
+    "list_tasks": 25,
+    "create_task": 10,
+    "update_task": 15,
+    "list_time_entries": 10,
+    "create_time_entry": 15,
+    "dashboard": 15
+}
+
+COUNTED_METHODS = {
+    "find", "find_one", "insert_one", "insert_many", "update_one", "update_many",
+    "delete_one", "delete_many", "find_one_and_update", "find_one_and_delete",
+    "aggregate", "bulk_write", "count_documents"
+}
+# explain is issued by the query profiler, not by the routes
+# Collection method -> the server command it would send, for profiler shapes
+METHOD_COMMANDS = {
+    "find": "find", "find_one": "find", "count_documents": "aggregate", "aggregate": "aggregate",
+    "insert_one": "insert", "insert_many": "insert", "update_one": "update", "update_many": "update",
+    "delete_one": "delete", "delete_many": "delete", "bulk_write": "bulkWrite",
+    "find_one_and_update": "findAndModify", "find_one_and_delete": "findAndModify"
+}
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "buildInfo", "explain"}
+
+
+class OpCounter:
+    def __init__(self):
+        self.ops = 0
+        # metrics.current_request, when the query profiler should see mongomock calls
+        self.request_context = None
+
+
+class CountingCollection:
+    def __init__(self, collection, counter: OpCounter):
+        self._collection = collection
+        self._counter = counter
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in COUNTED_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            self._counter.ops += 1
+            request = self._counter.request_context.get() if self._counter.request_context else None
+            if request is not None:
+                # mongomock emits no command events; hand the profiler the
+                # call's filter so repeated shapes are still detected
+                body = {"filter": args[0]} if args and isinstance(args[0], dict) else {}
+                request.add_statement(self._collection.name, METHOD_COMMANDS[name], body)
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, database, counter: OpCounter):
+        self._database = database
+        self._counter = counter
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name], self._counter)
+
+    def __getattr__(self, name):
+        attr = getattr(self._database, name)
+        if name.startswith("_") or callable(attr):
+            return attr
+        return CountingCollection(attr, self._counter)
+
+
+class AuthStub:
+    """Minimal HTTP/1.1 stand-in for the auth provider's session-data endpoint.
+
+    The session id carries the email to log in as, so callbacks land on the
+    seeded users the way a returning login would.
+    """
+
+    def __init__(self):
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await asyncio.start_server(self.handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}/auth/v1/env/oauth/session-data"
+
+    async def handle(self, reader, writer):
+        # Keep-alive: the pooled client sends every exchange on a few connections
+        try:
+            while True:
+                head = (await reader.readuntil(b"\r\n\r\n")).decode("latin-1")
+                headers = dict(
+                    (name.strip().lower(), value.strip())
+                    for name, _, value in (line.partition(":") for line in head.split("\r\n")[1:] if line)
+                )
+                nonce, _, email = headers.get("x-session-id", "").partition(":")
+                body = json.dumps({"session_token": f"stub_{nonce}", "email": email, "name": "Bench", "picture": None}).encode()
+                writer.write(
+                    b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n" % len(body) + body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+def connect(server, mongo_url, db_name: str, counter: OpCounter):
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from pymongo import monitoring
+
+        class CommandCounter(monitoring.CommandListener):
+            def started(self, event):
+                if event.command_name not in IGNORED_COMMANDS:
+                    counter.ops += 1
+
+            def succeeded(self, event):
+                pass
+
+            def failed(self, event):
+                pass
+
+        client = AsyncIOMotorClient(
+            mongo_url,
+            tz_aware=True,
+            event_listeners=[CommandCounter(), server.mongo_command_listener]
+        )
+        server.client, server.db = client, client[db_name]
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+
+        client = AsyncMongoMockClient(tz_aware=True)
+        server.client, server.db = client, CountingDatabase(client[db_name], counter)
+        server.transactions_supported = False
+        import metrics
+        counter.request_context = metrics.current_request if metrics.query_profiler.enabled else None
+    return client
+
+
+async def seed(server, users: int, tasks_per_user: int, entries_per_user: int):
+    now = datetime.now(timezone.utc)
+    seeded = []
+    for u in range(users):
+        user_id, token = f"user_bench{u:05d}", f"bench_token_{u:05d}"
+        await server.db.users.insert_one({
+            "user_id": user_id,
+            "email": f"bench{u}@example.com",
+            "name": f"Bench {u}",
+            "settings": server.UserSettings().model_dump(),
+            "created_at": now
+        })
+        await server.db.user_sessions.insert_one({
+            "user_id": user_id,
+            "session_token": token,
+            "expires_at": now + timedelta(days=1),
+            "created_at": now
+        })
+
+        tasks = [
+            server.new_task_doc(user_id, server.TaskCreate(title=f"Task {i}", tags=[f"t{i % 10}"]), now - timedelta(minutes=i))
+            for i in range(tasks_per_user)
+        ]
+        if tasks:
+            await server.db.tasks.insert_many(tasks)
+        entries = [
+            server.new_time_entry_doc(
+                user_id,
+                server.TimeEntryCreate(task_id=tasks[i % len(tasks)]["task_id"], duration=25),
+                now - timedelta(hours=i),
+                now - timedelta(hours=i)
+            )
+            for i in range(entries_per_user if tasks else 0)
+        ]
+        if entries:
+            await server.db.time_entries.insert_many(entries)
+
+        seeded.append({
+            "user_id": user_id,
+            "email": f"bench{u}@example.com",
+            "token": token,
+            "task_ids": [task["task_id"] for task in tasks]
+        })
+    return seeded
+
+
+async def run_operation(http, name: str, user, rng: random.Random) -> int:
+    headers = {"Authorization": f"Bearer {user['token']}"}
+    if name == "auth_callback":
+        session_id = f"{rng.getrandbits(64):016x}:{user['email']}"
+        response = await http.post("/api/auth/callback", params={"session_id": session_id})
+    elif name == "auth_me":
+        response = await http.get("/api/auth/me", headers=headers)
+    elif name == "list_tasks":
+        response = await http.get("/api/tasks", params={"limit": 100}, headers=headers)
+    elif name == "create_task":
+        response = await http.post("/api/tasks", json={"title": "Load task", "priority": "high"}, headers=headers)
+        if response.status_code == 200:
+            user["task_ids"].append(response.json()["task_id"])
+    elif name == "update_task":
+        task_id = rng.choice(user["task_ids"])
+        status = rng.choice(["todo", "in_progress", "done"])
+        response = await http.put(f"/api/tasks/{task_id}", json={"status": status}, headers=headers)
+    elif name == "list_time_entries":
+        response = await http.get("/api/time-entries", params={"limit": 100}, headers=headers)
+    elif name == "create_time_entry":
+        task_id = rng.choice(user["task_ids"])
+        response = await http.post("/api/time-entries", json={"task_id": task_id, "duration": 25}, headers=headers)
+    elif name == "dashboard":
+        response = await http.get("/api/dashboard/overview", headers=headers)
+    else:
+        raise ValueError(f"Unknown operation {name}")
+    return response.status_code
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # Nearest-rank percentile
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2)
+    }
+
+
+async def calibrate(http, users, counter: OpCounter, rounds: int = 3) -> dict:
+    # Repeated calls for one user, so the median reflects warm caches
+    rng = random.Random(0)
+    ops_per_request = {}
+    for name in OPERATION_MIX:
+        samples = []
+        for _ in range(rounds):
+            before = counter.ops
+            await run_operation(http, name, users[0], rng)
+            samples.append(counter.ops - before)
+        ops_per_request[name] = sorted(samples)[len(samples) // 2]
+    return ops_per_request
+
+
+async def load(http, users, concurrency: int, total_requests: int, seed_value: int):
+    names, weights = list(OPERATION_MIX), list(OPERATION_MIX.values())
+    latencies = {name: [] for name in names}
+    errors = {name: 0 for name in names}
+    remaining = [total_requests]
+
+    async def worker(worker_id: int):
+        rng = random.Random(seed_value + worker_id)
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            name = rng.choices(names, weights)[0]
+            user = rng.choice(users)
+            started = time.perf_counter()
+            status = await run_operation(http, name, user, rng)
+            latencies[name].append(time.perf_counter() - started)
+            if status >= 400:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(i) for i in range(concurrency)])
+    return latencies, errors, time.perf_counter() - started
+
+
+async def benchmark(args) -> dict:
+    os.environ.setdefault("MONGO_URL", args.mongo_url or "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", args.db_name)
+    os.environ["INDEX_REPORT"] = "false"
+    if args.profile:
+        os.environ["PROFILE_QUERIES"] = "true"
+        os.environ["PROFILE_LOG_PATH"] = str(Path(args.profile_log).resolve())
+    auth_stub = AuthStub()
+    os.environ["EMERGENT_AUTH_URL"] = await auth_stub.start()
+    sys.path.insert(0, str(BACKEND_DIR))
+    from http.cookiejar import CookieJar, DefaultCookiePolicy
+    import httpx
+    import server
+    # Every request's INFO line would drown the report
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    counter = OpCounter()
+    client = connect(server, args.mongo_url, args.db_name, counter)
+    if args.mongo_url:
+        await client.drop_database(args.db_name)
+        await server.ensure_indexes()
+    server.session_cache.clear()
+
+    users = await seed(server, args.users, args.tasks_per_user, args.entries_per_user)
+
+    transport = httpx.ASGITransport(app=server.app)
+    # The callback's session cookie would take precedence over every later
+    # request's bearer token, so the client keeps no cookies
+    cookies = httpx.Cookies(CookieJar(DefaultCookiePolicy(allowed_domains=[])))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60, cookies=cookies) as http:
+        ops_per_request = await calibrate(http, users, counter)
+        ops_before = counter.ops
+        latencies, errors, elapsed = await load(http, users, args.concurrency, args.requests, args.seed)
+        total_ops = counter.ops - ops_before
+    # Let in-flight explain captures finish writing
+    await asyncio.sleep(0.5)
+    if server.http_client is not None:
+        await server.http_client.aclose()
+    await auth_stub.stop()
+
+    if args.mongo_url:
+        await client.drop_database(args.db_name)
+    client.close()
+
+    all_latencies = [value for values in latencies.values() for value in values]
+    operations = {
+        name: {**summarize(latencies[name], errors[name], elapsed), "mongo_ops_per_request": ops_per_request[name]}
+        for name in OPERATION_MIX
+    }
+    overall = summarize(all_latencies, sum(errors.values()), elapsed)
+    overall["mongo_ops_per_request"] = round(total_ops / len(all_latencies), 2) if all_latencies else 0.0
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "backend": "mongod" if args.mongo_url else "mongomock",
+            "users": args.users,
+            "tasks_per_user": args.tasks_per_user,
+            "entries_per_user": args.entries_per_user,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "seed": args.seed,
+            "fast_json": server.FAST_JSON
+        },
+        "environment": {"python": platform.python_version(), "platform": platform.platform()},
+        "overall": overall,
+        "operations": operations,
+        "query_profile": server.query_profiler.stats() if args.profile else None
+    }
+
+
+def print_report(results: dict, baseline=None):
+    columns = ("requests", "errors", "p50_ms", "p95_ms", "p99_ms", "mongo_ops_per_request")
+    print(f"{'operation':<18}" + "".join(f"{column:>22}" for column in columns))
+    rows = [*results["operations"].items(), ("overall", results["overall"])]
+    for name, row in rows:
+        cells = []
+        for column in columns:
+            cell = f"{row[column]}"
+            if baseline is not None and column.endswith("_ms"):
+                previous = (baseline["operations"].get(name) if name != "overall" else baseline["overall"]) or {}
+                if previous.get(column):
+                    cell += f" ({(row[column] - previous[column]) / previous[column]:+.0%})"
+            cells.append(f"{cell:>22}")
+        print(f"{name:<18}" + "".join(cells))
+    print(f"\nthroughput: {results['overall']['throughput_rps']} req/s")
+    if results.get("query_profile"):
+        profile = results["query_profile"]
+        print(f"flagged requests: {profile['flagged'] or 'none'} (details in {profile['log_path']})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--tasks-per-user", type=int, default=200)
+    parser.add_argument("--entries-per-user", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--mongo-url", help="run against this mongod instead of mongomock-motor")
+    parser.add_argument("--db-name", default="devflow_benchmark")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="show latency changes against a previous results file")
+    parser.add_argument("--profile", action="store_true", help="flag N+1, command-heavy and slow requests with the query profiler")
+    parser.add_argument("--profile-log", default="query_profile.log")
+    args = parser.parse_args()
+    if args.users < 1 or args.tasks_per_user < 1:
+        parser.error("--users and --tasks-per-user must be at least 1")
+
+    results = asyncio.run(benchmark(args))
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    print_report(results, baseline)
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""CPU cost of GET /api/tasks with and without the FAST_JSON response path.
+
+Each mode runs in its own process (FAST_JSON is read at import time) against
+an in-memory mongomock-motor database, so only the server's own work is
+measured. Two numbers are reported per task count:
+
+- request: process CPU for the whole request through the ASGI app
+- encode: CPU for turning the fetched documents into response bytes, i.e.
+  model building, response_model validation and JSON rendering
+
+Usage: python benchmarks/tasks_serialization.py [--sizes 100,1000,5000] [--repeat 20] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone, timedelta
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def seed_tasks(server, user_id: str, count: int):
+    now = datetime.now(timezone.utc)
+    docs = []
+    for i in range(count):
+        task_data = server.TaskCreate(
+            title=f"Task {i}",
+            description="Benchmark task with a short description",
+            tags=["bench", f"t{i % 10}"],
+            estimated_time=30
+        )
+        docs.append(server.new_task_doc(user_id, task_data, now - timedelta(seconds=i)))
+    return docs
+
+
+async def measure(sizes, repeat: int):
+    import httpx
+    from fastapi.routing import serialize_response
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+
+    mock = AsyncMongoMockClient(tz_aware=True)
+    server.client = mock
+    server.db = mock["benchmark"]
+    server.session_cache.clear()
+
+    user_id, token = "user_bench", "bench_token"
+    now = datetime.now(timezone.utc)
+    await server.db.users.insert_one({"user_id": user_id, "email": "bench@example.com", "name": "Bench", "created_at": now})
+    await server.db.user_sessions.insert_one({"user_id": user_id, "session_token": token, "expires_at": now + timedelta(days=1), "created_at": now})
+
+    route = next(r for r in server.app.routes if getattr(r, "path", None) == "/api/tasks" and "GET" in r.methods)
+    transport = httpx.ASGITransport(app=server.app)
+    results = {}
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        for size in sizes:
+            await server.db.tasks.delete_many({})
+            await server.db.tasks.insert_many(seed_tasks(server, user_id, size))
+            docs = await server.db.tasks.find({"user_id": user_id}, {"_id": 0}).to_list(length=None)
+
+            request_cpu, encode_cpu = [], []
+            for _ in range(repeat):
+                started = time.process_time()
+                response = await http.get("/api/tasks", params={"limit": size}, headers={"Authorization": f"Bearer {token}"})
+                request_cpu.append(time.process_time() - started)
+                assert response.status_code == 200 and len(response.json()) == size
+
+                started = time.process_time()
+                content = server.list_response(server.Task, docs, server.Response())
+                if isinstance(content, server.Response):
+                    content.body
+                else:
+                    content = await serialize_response(field=route.response_field, response_content=content)
+                    route.response_class(content).body
+                encode_cpu.append(time.process_time() - started)
+
+            results[str(size)] = {
+                "request_cpu_ms": round(statistics.median(request_cpu) * 1000, 2),
+                "encode_cpu_ms": round(statistics.median(encode_cpu) * 1000, 2)
+            }
+    return results
+
+
+def run_mode(fast_json: bool, sizes, repeat: int):
+    env = {**os.environ, "FAST_JSON": "true" if fast_json else "false", "INDEX_REPORT": "false"}
+    env.setdefault("MONGO_URL", "mongodb://localhost:27017")
+    env.setdefault("DB_NAME", "benchmark")
+    output = subprocess.run(
+        [sys.executable, __file__, "--worker", "--sizes", ",".join(map(str, sizes)), "--repeat", str(repeat)],
+        env=env, cwd=BACKEND_DIR, check=True, stdout=subprocess.PIPE, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,5000")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--output")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    sizes = [int(size) for size in args.sizes.split(",")]
+
+    if args.worker:
+        sys.path.insert(0, str(BACKEND_DIR))
+        print(json.dumps(asyncio.run(measure(sizes, args.repeat))))
+        return 0
+
+    results = {"before": run_mode(False, sizes, args.repeat), "after": run_mode(True, sizes, args.repeat)}
+
+    print(f"{'tasks':>6} {'request before':>15} {'request after':>14} {'encode before':>14} {'encode after':>13}")
+    for size in map(str, sizes):
+        before, after = results["before"][size], results["after"][size]
+        print(
+            f"{size:>6} {before['request_cpu_ms']:>13.2f}ms {after['request_cpu_ms']:>12.2f}ms "
+            f"{before['encode_cpu_ms']:>12.2f}ms {after['encode_cpu_ms']:>11.2f}ms"
+        )
+
+    if args.output:
+        Path(args.output).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
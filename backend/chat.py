@@ -0,0 +1,442 @@
+from fastapi import APIRouter, HTTPException, Request, Header, Query
+from pydantic import BaseModel, Field, ConfigDict
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from typing import List, Optional, Dict, Any, Callable
+from collections import OrderedDict, deque
+from datetime import datetime, timedelta, timezone
+from enum import Enum
+import os
+import time
+import uuid
+
+CHAT_BUFFER_SIZE = int(os.environ.get('CHAT_BUFFER_SIZE', '200'))
+CHAT_BUFFER_CONVERSATIONS = int(os.environ.get('CHAT_BUFFER_CONVERSATIONS', '1000'))
+CHAT_BUFFER_FRESHNESS_SECONDS = float(os.environ.get('CHAT_BUFFER_FRESHNESS_SECONDS', '1'))
+CHAT_SEQ_GAP_SECONDS = float(os.environ.get('CHAT_SEQ_GAP_SECONDS', '5'))
+MATCH_CANDIDATE_SCAN = 200
+
+# Enums
+class MatchStatus(str, Enum):
+    PENDING = "pending"
+    MATCHED = "matched"
+    REJECTED = "rejected"
+
+class MatchAction(str, Enum):
+    LIKE = "like"
+    REJECT = "reject"
+
+# Models
+class GamingProfile(BaseModel):
+    games: List[str] = []
+    platform: Optional[str] = None
+    style: Optional[str] = None
+    communication: Optional[str] = None
+    tolerance: int = Field(3, ge=1, le=5)
+    goal: Optional[str] = None
+
+class ProfileUpdate(BaseModel):
+    gaming_profile: Optional[GamingProfile] = None
+    availability_schedule: Optional[Dict[str, Any]] = None
+
+class MatchActionRequest(BaseModel):
+    match_id: str
+    action: MatchAction
+
+class MessageCreate(BaseModel):
+    text: str = Field(..., min_length=1, max_length=2000)
+
+class Message(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    message_id: str
+    chat_id: str
+    seq: int
+    sender_id: str
+    text: str
+    timestamp: datetime
+
+# Indexes
+CHAT_INDEXES: Dict[str, List[IndexModel]] = {
+    "matches": [
+        IndexModel([("match_id", ASCENDING)], name="match_id_unique", unique=True),
+        IndexModel([("pair_key", ASCENDING)], name="pair_key_unique", unique=True),
+        IndexModel([("participants", ASCENDING), ("status", ASCENDING)], name="participants_status")
+    ],
+    "messages": [
+        IndexModel([("chat_id", ASCENDING), ("seq", ASCENDING)], name="chat_seq_unique", unique=True)
+    ],
+    "users": [
+        IndexModel([("gaming_profile.games", ASCENDING)], name="gaming_profile_games")
+    ]
+}
+
+CHAT_QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"route": "get_matches", "collection": "matches", "filter": {"participants": ""}},
+    {"route": "get_matches", "collection": "users", "filter": {"gaming_profile.games": {"$in": [""]}}},
+    {"route": "get_chat", "collection": "matches", "filter": {"match_id": "", "participants": ""}},
+    {"route": "get_chat", "collection": "messages", "filter": {"chat_id": "", "seq": {"$gt": 0}}, "sort": [("seq", ASCENDING)]}
+]
+
+# Conversation Buffer
+class ConversationBuffer:
+    def __init__(self, participants: List[str], last_seq: int, max_size: int):
+        self.participants = participants
+        self.last_seq = last_seq
+        self.messages: deque = deque(maxlen=max_size)
+        self.refreshed_at = time.monotonic()
+
+    def first_seq(self) -> int:
+        return self.messages[0]["seq"] if self.messages else self.last_seq + 1
+
+    def add(self, message: Dict[str, Any]):
+        # Messages arrive in seq order from the send route and from reads;
+        # anything else would leave a gap, so the buffer restarts from it
+        if self.messages and message["seq"] != self.messages[-1]["seq"] + 1:
+            if message["seq"] <= self.messages[-1]["seq"]:
+                return
+            self.messages.clear()
+        self.messages.append(message)
+        self.last_seq = max(self.last_seq, message["seq"])
+
+    def covers(self, since: int) -> bool:
+        if since >= self.last_seq:
+            return True
+        # The tail must be current too: last_seq runs ahead of the buffer
+        # when another process wrote the newer messages
+        return bool(self.messages) and self.messages[-1]["seq"] == self.last_seq and since + 1 >= self.first_seq()
+
+
+def contiguous_messages(messages: List[Dict[str, Any]], after: int, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    # A seq is allocated before its message is inserted, so a concurrent send
+    # can land seq n + 1 before seq n. Only the gap-free run after `after` is
+    # returned; last_seq then stops short of the gap and the next read fills it.
+    # A send that fails or dies between the two writes never fills its seq, so
+    # once the message after a gap is older than CHAT_SEQ_GAP_SECONDS the gap
+    # is taken as abandoned and skipped.
+    abandoned_before = (now or datetime.now(timezone.utc)) - timedelta(seconds=CHAT_SEQ_GAP_SECONDS)
+    run, expected = [], after + 1
+    for message in messages:
+        if message["seq"] != expected and message["timestamp"] > abandoned_before:
+            break
+        run.append(message)
+        expected = message["seq"] + 1
+    return run
+
+
+class ConversationCache:
+    """Ring buffers of the most recent messages of hot conversations.
+
+    A buffer also remembers who may read the conversation and its latest seq.
+    While it is fresher than CHAT_BUFFER_FRESHNESS_SECONDS, reads that fall
+    inside it are served without touching Mongo; after that the match document
+    is re-read so messages written by other processes show up.
+    """
+
+    def __init__(self, max_conversations: int, buffer_size: int, freshness: float):
+        self.max_conversations = max_conversations
+        self.buffer_size = buffer_size
+        self.freshness = freshness
+        self._buffers: "OrderedDict[str, ConversationBuffer]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, chat_id: str) -> Optional[ConversationBuffer]:
+        buffer = self._buffers.get(chat_id)
+        if buffer is not None:
+            self._buffers.move_to_end(chat_id)
+        return buffer
+
+    def put(self, chat_id: str, participants: List[str], last_seq: int) -> ConversationBuffer:
+        buffer = self._buffers.get(chat_id)
+        if buffer is None:
+            buffer = self._buffers[chat_id] = ConversationBuffer(participants, last_seq, self.buffer_size)
+            while len(self._buffers) > self.max_conversations:
+                self._buffers.popitem(last=False)
+        buffer.last_seq = max(buffer.last_seq, last_seq)
+        buffer.refreshed_at = time.monotonic()
+        self._buffers.move_to_end(chat_id)
+        return buffer
+
+    def is_fresh(self, buffer: ConversationBuffer) -> bool:
+        return time.monotonic() - buffer.refreshed_at < self.freshness
+
+    def ingest(self, message: Dict[str, Any]):
+        buffer = self._buffers.get(message["chat_id"])
+        if buffer is not None:
+            buffer.add({key: value for key, value in message.items() if key != "_id"})
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "conversations": len(self._buffers),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+conversation_cache = ConversationCache(CHAT_BUFFER_CONVERSATIONS, CHAT_BUFFER_SIZE, CHAT_BUFFER_FRESHNESS_SECONDS)
+
+# Compatibility
+def compatibility(profile: Dict[str, Any], other: Dict[str, Any]) -> tuple:
+    score = 0
+    reasons = []
+
+    shared_games = [game for game in other.get("games", []) if game in profile.get("games", [])]
+    if shared_games:
+        score += min(40, 20 * len(shared_games))
+        reasons.append(f"Jogam {', '.join(shared_games[:3])}")
+    for field, points, reason in (
+        ("platform", 20, "Mesma plataforma"),
+        ("goal", 15, "Mesmo objetivo"),
+        ("style", 15, "Mesmo estilo de jogo"),
+        ("communication", 10, "Mesma forma de comunicação")
+    ):
+        if profile.get(field) and profile.get(field) == other.get(field):
+            score += points
+            reasons.append(reason)
+
+    return min(score, 100), reasons
+
+def public_profile(user_doc: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "user_id": user_doc["user_id"],
+        "name": user_doc.get("name"),
+        "picture": user_doc.get("picture"),
+        "gaming_profile": user_doc.get("gaming_profile")
+    }
+
+def pair_key(user_a: str, user_b: str) -> str:
+    return "|".join(sorted([user_a, user_b]))
+
+def create_chat_router(db, get_current_user: Callable, publish_changes: Callable) -> APIRouter:
+    router = APIRouter()
+
+    def publish_message(participants: List[str], message_doc: Dict[str, Any]):
+        data = {key: value for key, value in message_doc.items() if key not in ("_id", "participants")}
+        for user_id in participants:
+            publish_changes(user_id, [("message", "created", data)])
+
+    # Profile Routes
+    @router.get("/profile")
+    async def get_profile(request: Request, authorization: Optional[str] = Header(None)):
+        user = await get_current_user(request, authorization)
+        return await db.users.find_one(
+            {"user_id": user.user_id},
+            {"_id": 0, "user_id": 1, "name": 1, "picture": 1, "gaming_profile": 1, "availability_schedule": 1}
+        )
+
+    @router.put("/profile")
+    async def update_profile(
+        profile_data: ProfileUpdate,
+        request: Request,
+        authorization: Optional[str] = Header(None)
+    ):
+        user = await get_current_user(request, authorization)
+
+        update_dict = profile_data.model_dump(exclude_none=True)
+        if update_dict:
+            await db.users.update_one({"user_id": user.user_id}, {"$set": update_dict})
+
+        return {"message": "Profile updated"}
+
+    # Match Routes
+    @router.get("/matches")
+    async def get_matches(
+        request: Request,
+        authorization: Optional[str] = Header(None),
+        limit: int = Query(50, ge=1, le=100)
+    ):
+        user = await get_current_user(request, authorization)
+
+        me, my_matches = await db.users.find_one({"user_id": user.user_id}, {"_id": 0}), []
+        async for match_doc in db.matches.find({"participants": user.user_id}, {"_id": 0}):
+            my_matches.append(match_doc)
+
+        # Skip people this user already acted on or is chatting with; keep
+        # pending matches where only the other side has liked
+        skip = {user.user_id}
+        pending = {}
+        for match_doc in my_matches:
+            other_id = next(uid for uid in match_doc["participants"] if uid != user.user_id)
+            acted = user.user_id in match_doc.get("likes", []) or match_doc["status"] != MatchStatus.PENDING.value
+            if acted:
+                skip.add(other_id)
+            else:
+                pending[other_id] = match_doc["match_id"]
+
+        profile = (me or {}).get("gaming_profile") or {}
+        candidate_query: Dict[str, Any] = {"user_id": {"$nin": list(skip)}, "gaming_profile": {"$exists": True}}
+        if profile.get("games"):
+            candidate_query["gaming_profile.games"] = {"$in": profile["games"]}
+
+        candidates = []
+        async for other in db.users.find(candidate_query, {"_id": 0}).limit(MATCH_CANDIDATE_SCAN):
+            score, reasons = compatibility(profile, other.get("gaming_profile") or {})
+            candidates.append({
+                "match_id": pending.get(other["user_id"]),
+                "user": public_profile(other),
+                "compatibility_score": score,
+                "reasons": reasons
+            })
+
+        candidates.sort(key=lambda candidate: candidate["compatibility_score"], reverse=True)
+        return candidates[:limit]
+
+    @router.post("/matches/create")
+    async def create_match(
+        other_user_id: str,
+        request: Request,
+        authorization: Optional[str] = Header(None)
+    ):
+        user = await get_current_user(request, authorization)
+        if other_user_id == user.user_id:
+            raise HTTPException(status_code=400, detail="Cannot match with yourself")
+
+        other = await db.users.find_one({"user_id": other_user_id}, {"_id": 0, "user_id": 1})
+        if not other:
+            raise HTTPException(status_code=404, detail="User not found")
+
+        match_doc = await db.matches.find_one_and_update(
+            {"pair_key": pair_key(user.user_id, other_user_id)},
+            {"$setOnInsert": {
+                "match_id": f"match_{uuid.uuid4().hex[:12]}",
+                "participants": sorted([user.user_id, other_user_id]),
+                "initiator": user.user_id,
+                "likes": [],
+                "status": MatchStatus.PENDING.value,
+                "chat_id": None,
+                "message_count": 0,
+                "created_at": datetime.now(timezone.utc)
+            }},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+        return {"match_id": match_doc["match_id"], "status": match_doc["status"]}
+
+    @router.post("/matches/action")
+    async def match_action(
+        action_data: MatchActionRequest,
+        request: Request,
+        authorization: Optional[str] = Header(None)
+    ):
+        user = await get_current_user(request, authorization)
+
+        if action_data.action == MatchAction.REJECT:
+            update = {"$set": {"status": MatchStatus.REJECTED.value, "rejected_by": user.user_id}}
+        else:
+            update = {"$addToSet": {"likes": user.user_id}}
+
+        match_doc = await db.matches.find_one_and_update(
+            {"match_id": action_data.match_id, "participants": user.user_id, "status": {"$ne": MatchStatus.REJECTED.value}},
+            update,
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if not match_doc:
+            raise HTTPException(status_code=404, detail="Match not found")
+
+        # Both sides liked: open the chat, keyed by the match id
+        if match_doc["status"] == MatchStatus.PENDING.value and set(match_doc["likes"]) >= set(match_doc["participants"]):
+            match_doc = await db.matches.find_one_and_update(
+                {"match_id": match_doc["match_id"]},
+                {"$set": {"status": MatchStatus.MATCHED.value, "chat_id": match_doc["match_id"]}},
+                projection={"_id": 0},
+                return_document=ReturnDocument.AFTER
+            )
+            for participant in match_doc["participants"]:
+                publish_changes(participant, [("match", "updated", match_doc)])
+
+        return {"match_id": match_doc["match_id"], "status": match_doc["status"], "chat_id": match_doc.get("chat_id")}
+
+    # Chat Routes
+    async def load_conversation(match_id: str, user_id: str) -> ConversationBuffer:
+        buffer = conversation_cache.get(match_id)
+        if buffer is not None and conversation_cache.is_fresh(buffer):
+            if user_id not in buffer.participants:
+                raise HTTPException(status_code=404, detail="Chat not found")
+            return buffer
+
+        match_doc = await db.matches.find_one(
+            {"match_id": match_id, "participants": user_id},
+            {"_id": 0, "participants": 1, "status": 1, "message_count": 1}
+        )
+        if not match_doc or match_doc["status"] != MatchStatus.MATCHED.value:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        return conversation_cache.put(match_id, match_doc["participants"], match_doc.get("message_count", 0))
+
+    @router.get("/chats/{match_id}")
+    async def get_chat(
+        match_id: str,
+        request: Request,
+        authorization: Optional[str] = Header(None),
+        since: Optional[int] = Query(None, ge=0),
+        limit: int = Query(50, ge=1, le=200)
+    ):
+        user = await get_current_user(request, authorization)
+        buffer = await load_conversation(match_id, user.user_id)
+
+        # Without `since` the client wants the latest page of history
+        after = since if since is not None else max(0, buffer.last_seq - limit)
+        if buffer.covers(after):
+            conversation_cache.hits += 1
+            messages = contiguous_messages([message for message in buffer.messages if after < message["seq"] <= buffer.last_seq], after)
+        else:
+            conversation_cache.misses += 1
+            messages = await db.messages.find(
+                {"chat_id": match_id, "seq": {"$gt": after, "$lte": buffer.last_seq}},
+                {"_id": 0, "participants": 0}
+            ).sort("seq", ASCENDING).to_list(length=buffer.last_seq - after)
+            messages = contiguous_messages(messages, after)
+            for message in messages:
+                buffer.add(message)
+
+        messages = messages[:limit] if since is not None else messages[-limit:]
+        return {
+            "chat_id": match_id,
+            "match_id": match_id,
+            "participants": buffer.participants,
+            "messages": [Message(**message) for message in messages],
+            "last_seq": messages[-1]["seq"] if messages else after
+        }
+
+    @router.post("/chats/{match_id}/message", response_model=Message)
+    async def send_message(
+        match_id: str,
+        message_data: MessageCreate,
+        request: Request,
+        authorization: Optional[str] = Header(None)
+    ):
+        user = await get_current_user(request, authorization)
+        now = datetime.now(timezone.utc)
+
+        # Membership check and seq allocation are one atomic write
+        match_doc = await db.matches.find_one_and_update(
+            {"match_id": match_id, "participants": user.user_id, "status": MatchStatus.MATCHED.value},
+            {"$inc": {"message_count": 1}, "$set": {"last_message_at": now}},
+            projection={"_id": 0, "participants": 1, "message_count": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if not match_doc:
+            raise HTTPException(status_code=404, detail="Chat not found")
+
+        message_doc = {
+            "message_id": f"msg_{uuid.uuid4().hex[:12]}",
+            "chat_id": match_id,
+            "seq": match_doc["message_count"],
+            "sender_id": user.user_id,
+            "participants": match_doc["participants"],
+            "text": message_data.text,
+            "timestamp": now
+        }
+        await db.messages.insert_one(message_doc)
+
+        buffer = conversation_cache.put(match_id, match_doc["participants"], match_doc["message_count"])
+        buffer.add({key: value for key, value in message_doc.items() if key not in ("_id", "participants")})
+        publish_message(match_doc["participants"], message_doc)
+
+        return Message(**message_doc)
+
+    @router.get("/system/chat-cache")
+    async def get_chat_cache_stats():
+        return conversation_cache.stats()
+
+    return router
@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""Maintenance commands for the DevFlow backend.
+
+Run from the backend directory so the same .env as the API server is used:
+
+    python manage.py rebuild-stats [--user USER_ID]
+    python manage.py ensure-indexes
+    python manage.py migrate-dates [--batch-size N]
+    python manage.py rebuild-rollups [--user USER_ID]
+    python manage.py backfill-search-words [--batch-size N]
+    python manage.py archive-tasks [--days N] [--batch-size N]
+    python manage.py dedupe-users [--dry-run]
+"""
+import argparse
+import asyncio
+import logging
+import sys
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from server import (
+    ARCHIVE_AFTER_DAYS,
+    ARCHIVE_BATCH_SIZE,
+    archive_completed_tasks,
+    as_utc,
+    bump_user_version,
+    client,
+    db,
+    ensure_indexes,
+    find_collscan_queries,
+    rebuild_time_rollups,
+    rebuild_user_stats,
+    search_words,
+)
+from chat import pair_key
+
+logger = logging.getLogger("manage")
+
+# Collections whose documents belong to one user through user_id
+USER_OWNED_COLLECTIONS = [
+    "tasks", "tasks_archive", "sprints", "time_entries", "time_entries_archive",
+    "task_events", "sprint_burndowns", "user_sessions",
+]
+# Per-user documents derived from the owned ones; rebuilt after a merge
+USER_DERIVED_COLLECTIONS = ["user_stats", "time_rollups", "user_versions"]
+
+# Fields that older versions of the API stored as isoformat() strings.
+DATE_FIELDS = {
+    "users": ["created_at"],
+    "user_sessions": ["expires_at", "created_at"],
+    "tasks": ["created_at", "updated_at", "completed_at"],
+    "sprints": ["start_date", "end_date", "created_at"],
+    "time_entries": ["start_time", "end_time", "created_at"],
+}
+
+
+async def rebuild_stats(user_id=None):
+    if user_id:
+        user_ids = [user_id]
+    else:
+        user_ids = await db.users.distinct("user_id")
+
+    for uid in user_ids:
+        previous = await db.user_stats.find_one({"user_id": uid}, {"_id": 0, "updated_at": 0})
+        rebuilt = await rebuild_user_stats(uid)
+        # Clients holding the dashboard ETag would otherwise keep getting 304
+        # with the old counters until the user's next write
+        await bump_user_version(uid)
+        rebuilt.pop("updated_at", None)
+        if previous and previous != rebuilt:
+            logger.warning("Repaired drifted stats for %s", uid)
+    logger.info("Rebuilt stats for %d user(s)", len(user_ids))
+
+
+async def rebuild_rollups(user_id=None):
+    user_ids = [user_id] if user_id else await db.users.distinct("user_id")
+    for uid in user_ids:
+        entries = await rebuild_time_rollups(uid)
+        logger.info("Rebuilt time rollups for %s from %d entries", uid, entries)
+
+
+async def ensure_indexes_and_report():
+    await ensure_indexes()
+    collscans = await find_collscan_queries()
+    for query in collscans:
+        logger.warning("Query would run as COLLSCAN: %s", query)
+    return 1 if collscans else 0
+
+
+async def migrate_collection_dates(collection_name, fields, batch_size):
+    # Only documents still holding a string date match, so an interrupted run
+    # resumes where it stopped. Walking by _id keeps unparseable values from
+    # being fetched again within the same run.
+    string_filter = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    projection = {field: 1 for field in fields}
+    last_id = None
+    migrated = 0
+
+    while True:
+        query = dict(string_filter)
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db[collection_name].find(query, projection).sort("_id", 1).to_list(length=batch_size)
+        if not batch:
+            break
+
+        operations = []
+        for doc in batch:
+            converted = {}
+            for field in fields:
+                value = doc.get(field)
+                if not isinstance(value, str):
+                    continue
+                try:
+                    converted[field] = as_utc(datetime.fromisoformat(value))
+                except ValueError:
+                    logger.warning("Skipping unparseable %s.%s on %s: %r", collection_name, field, doc["_id"], value)
+            if converted:
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": converted}))
+
+        if operations:
+            result = await db[collection_name].bulk_write(operations, ordered=False)
+            migrated += result.modified_count
+        last_id = batch[-1]["_id"]
+
+    logger.info("Migrated %d %s document(s) to native dates", migrated, collection_name)
+
+
+async def migrate_dates(batch_size):
+    for collection_name, fields in DATE_FIELDS.items():
+        await migrate_collection_dates(collection_name, fields, batch_size)
+
+
+async def backfill_search_words(batch_size):
+    # Tasks created before search existed have no search_words; like
+    # migrate-dates, only unconverted documents match, so reruns resume
+    last_id = None
+    backfilled = 0
+
+    while True:
+        query = {"search_words": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = await db.tasks.find(query, {"title": 1}).sort("_id", 1).to_list(length=batch_size)
+        if not batch:
+            break
+
+        operations = [
+            UpdateOne({"_id": doc["_id"]}, {"$set": {"search_words": search_words(doc.get("title"))}})
+            for doc in batch
+        ]
+        result = await db.tasks.bulk_write(operations, ordered=False)
+        backfilled += result.modified_count
+        last_id = batch[-1]["_id"]
+
+    logger.info("Backfilled search words on %d task(s)", backfilled)
+
+
+async def archive_tasks(days, batch_size):
+    archived = await archive_completed_tasks(days, batch_size)
+    logger.info("Archived %d task(s) completed more than %d day(s) ago", archived, days)
+
+
+async def merge_user(keeper, duplicate):
+    keeper_id, duplicate_id = keeper["user_id"], duplicate["user_id"]
+
+    for collection_name in USER_OWNED_COLLECTIONS:
+        result = await db[collection_name].update_many({"user_id": duplicate_id}, {"$set": {"user_id": keeper_id}})
+        if result.modified_count:
+            logger.info("Moved %d %s from %s to %s", result.modified_count, collection_name, duplicate_id, keeper_id)
+
+    # Matches are keyed by the participant pair, so one the keeper already
+    # has with the same player cannot be moved and is left for manual review
+    async for match_doc in db.matches.find({"participants": duplicate_id}):
+        participants = sorted({keeper_id if uid == duplicate_id else uid for uid in match_doc["participants"]})
+        if len(participants) < 2:
+            logger.warning("Left match %s between %s and its duplicate %s", match_doc["match_id"], keeper_id, duplicate_id)
+            continue
+        update = {
+            "participants": participants,
+            "pair_key": pair_key(*participants),
+            "likes": [keeper_id if uid == duplicate_id else uid for uid in match_doc.get("likes", [])],
+        }
+        if match_doc.get("rejected_by") == duplicate_id:
+            update["rejected_by"] = keeper_id
+        try:
+            await db.matches.update_one({"_id": match_doc["_id"]}, {"$set": update})
+        except DuplicateKeyError:
+            logger.warning("Left match %s: %s already has a match with the same player", match_doc["match_id"], keeper_id)
+            continue
+        await db.messages.update_many({"chat_id": match_doc["match_id"], "sender_id": duplicate_id}, {"$set": {"sender_id": keeper_id}})
+        await db.messages.update_many({"chat_id": match_doc["match_id"]}, {"$set": {"participants": participants}})
+
+    # Profile fields only the duplicate has filled in are kept
+    missing = {key: value for key, value in duplicate.items() if key not in keeper and key != "_id"}
+    if missing:
+        await db.users.update_one({"_id": keeper["_id"]}, {"$set": missing})
+
+    for collection_name in USER_DERIVED_COLLECTIONS:
+        await db[collection_name].delete_many({"user_id": duplicate_id})
+    await db.users.delete_one({"_id": duplicate["_id"]})
+    await rebuild_user_stats(keeper_id)
+    await rebuild_time_rollups(keeper_id)
+    await bump_user_version(keeper_id)
+
+
+async def dedupe_users(dry_run=False):
+    # Concurrent logins before the unique email index existed could create a
+    # user per callback; the earliest one is kept and the others merged in
+    pipeline = [
+        {"$group": {"_id": "$email", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    duplicated = await db.users.aggregate(pipeline).to_list(length=None)
+    merged = 0
+    for group in duplicated:
+        users = await db.users.find({"email": group["_id"]}).sort([("created_at", 1), ("_id", 1)]).to_list(length=None)
+        keeper, duplicates = users[0], users[1:]
+        logger.info(
+            "%s: keeping %s, merging %s", group["_id"], keeper["user_id"], ", ".join(doc["user_id"] for doc in duplicates)
+        )
+        if dry_run:
+            continue
+        for duplicate in duplicates:
+            await merge_user(keeper, duplicate)
+            merged += 1
+
+    logger.info("Found %d duplicated email(s), merged %d user(s)", len(duplicated), merged)
+    if merged:
+        await ensure_indexes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    rebuild_parser = subparsers.add_parser("rebuild-stats", help="Recompute dashboard counters from scratch")
+    rebuild_parser.add_argument("--user", dest="user_id", help="Only rebuild this user's counters")
+    subparsers.add_parser("ensure-indexes", help="Create declared indexes and report queries that would COLLSCAN")
+    migrate_parser = subparsers.add_parser("migrate-dates", help="Convert legacy ISO string timestamps to BSON dates")
+    migrate_parser.add_argument("--batch-size", type=int, default=500, help="Documents converted per bulk write")
+    rollups_parser = subparsers.add_parser("rebuild-rollups", help="Recompute time report rollups from raw time entries")
+    rollups_parser.add_argument("--user", dest="user_id", help="Only rebuild this user's rollups")
+    search_parser = subparsers.add_parser("backfill-search-words", help="Add prefix search words to tasks created before search")
+    search_parser.add_argument("--batch-size", type=int, default=500, help="Tasks updated per bulk write")
+    archive_parser = subparsers.add_parser("archive-tasks", help="Move old completed tasks and their time entries to the archive")
+    archive_parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS or 90, help="Archive tasks completed more than this many days ago")
+    archive_parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="Tasks moved per batch")
+    dedupe_parser = subparsers.add_parser("dedupe-users", help="Merge users created twice for the same email")
+    dedupe_parser.add_argument("--dry-run", action="store_true", help="Only report the duplicates")
+
+    args = parser.parse_args()
+
+    exit_code = 0
+    try:
+        if args.command == "rebuild-stats":
+            asyncio.run(rebuild_stats(args.user_id))
+        elif args.command == "ensure-indexes":
+            exit_code = asyncio.run(ensure_indexes_and_report())
+        elif args.command == "migrate-dates":
+            asyncio.run(migrate_dates(args.batch_size))
+        elif args.command == "rebuild-rollups":
+            asyncio.run(rebuild_rollups(args.user_id))
+        elif args.command == "backfill-search-words":
+            asyncio.run(backfill_search_words(args.batch_size))
+        elif args.command == "archive-tasks":
+            asyncio.run(archive_tasks(args.days, args.batch_size))
+        elif args.command == "dedupe-users":
+            asyncio.run(dedupe_users(args.dry_run))
+    finally:
+        client.close()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
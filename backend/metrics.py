@@ -0,0 +1,435 @@
+from contextvars import ContextVar
+from pymongo import monitoring
+from typing import List, Optional, Dict, Any, Tuple, Callable
+from datetime import datetime, timezone
+from logging.handlers import RotatingFileHandler
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+
+HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+MONGO_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+COMMANDS_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+# Driver housekeeping that no route issues
+IGNORED_COMMANDS = {"hello", "ismaster", "isMaster", "ping", "endSessions", "saslStart", "saslContinue", "buildInfo"}
+
+# Commands whose first argument is not the collection name
+COLLECTION_ARGUMENTS = {"getMore": "collection"}
+
+PROFILE_QUERIES = os.environ.get('PROFILE_QUERIES', 'false').lower() == 'true'
+PROFILE_MAX_COMMANDS = int(os.environ.get('PROFILE_MAX_COMMANDS', '10'))
+PROFILE_LATENCY_BUDGET_MS = float(os.environ.get('PROFILE_LATENCY_BUDGET_MS', '500'))
+PROFILE_REPEAT_THRESHOLD = int(os.environ.get('PROFILE_REPEAT_THRESHOLD', '3'))
+PROFILE_LOG_PATH = os.environ.get('PROFILE_LOG_PATH', 'query_profile.log')
+PROFILE_LOG_MAX_BYTES = int(os.environ.get('PROFILE_LOG_MAX_BYTES', str(10 * 1024 * 1024)))
+PROFILE_LOG_BACKUPS = 5
+PROFILE_EXPLAIN_LIMIT = 5
+
+EXPLAINABLE_COMMANDS = {"find", "aggregate", "count", "distinct", "findAndModify", "update", "delete"}
+
+# Driver-added fields that explain() rejects or that make no sense to log
+COMMAND_ENVELOPE_FIELDS = {"$db", "lsid", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction"}
+
+class Histogram:
+    def __init__(self, buckets: tuple):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+
+class MetricsRegistry:
+    """Per-process request and Mongo command metrics in Prometheus text format.
+
+    Mongo commands are attributed to the route whose request issued them; the
+    route label is the path template, so label cardinality stays bounded.
+    Commands issued outside a request (startup, background tasks) are
+    labelled route="-".
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        self.request_seconds: Dict[Tuple[str, str], Histogram] = {}
+        self.commands_per_request: Dict[Tuple[str, str], Histogram] = {}
+        self.mongo_commands: Dict[Tuple[str, str, str], int] = {}
+        self.mongo_failures: Dict[Tuple[str, str, str], int] = {}
+        self.mongo_documents: Dict[Tuple[str, str, str], int] = {}
+        self.mongo_seconds: Dict[Tuple[str, str], Histogram] = {}
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def request_finished(self, route: str, method: str, status: int, seconds: float, commands: List[tuple]):
+        with self._lock:
+            self.in_flight -= 1
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._histogram(self.request_seconds, (route, method), HTTP_BUCKETS).observe(seconds)
+            self._histogram(self.commands_per_request, (route, method), COMMANDS_PER_REQUEST_BUCKETS).observe(len(commands))
+            for command in commands:
+                self._record_command(route, *command)
+
+    def command_finished(self, route: str, collection: str, command: str, seconds: float, documents: int, failed: bool):
+        with self._lock:
+            self._record_command(route, collection, command, seconds, documents, failed)
+
+    def _record_command(self, route: str, collection: str, command: str, seconds: float, documents: int, failed: bool):
+        key = (route, collection, command)
+        self.mongo_commands[key] = self.mongo_commands.get(key, 0) + 1
+        if failed:
+            self.mongo_failures[key] = self.mongo_failures.get(key, 0) + 1
+        if documents:
+            self.mongo_documents[key] = self.mongo_documents.get(key, 0) + documents
+        self._histogram(self.mongo_seconds, (collection, command), MONGO_BUCKETS).observe(seconds)
+
+    @staticmethod
+    def _histogram(histograms: Dict[tuple, Histogram], key: tuple, buckets: tuple) -> Histogram:
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+
+    def render(self) -> str:
+        with self._lock:
+            lines = []
+            counter(lines, "http_requests_total", "HTTP requests by route, method and status.",
+                    ("route", "method", "status"), self.requests)
+            lines += [
+                "# HELP http_requests_in_flight HTTP requests currently being served.",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.in_flight}"
+            ]
+            histogram(lines, "http_request_duration_seconds", "HTTP request latency by route and method.",
+                      ("route", "method"), self.request_seconds)
+            histogram(lines, "http_request_mongo_commands", "Mongo commands issued per HTTP request.",
+                      ("route", "method"), self.commands_per_request)
+            counter(lines, "mongo_commands_total", "Mongo commands by originating route, collection and command.",
+                    ("route", "collection", "command"), self.mongo_commands)
+            counter(lines, "mongo_command_failures_total", "Failed Mongo commands by originating route, collection and command.",
+                    ("route", "collection", "command"), self.mongo_failures)
+            counter(lines, "mongo_documents_returned_total", "Documents returned or affected by Mongo commands.",
+                    ("route", "collection", "command"), self.mongo_documents)
+            histogram(lines, "mongo_command_duration_seconds", "Mongo command latency by collection and command.",
+                      ("collection", "command"), self.mongo_seconds)
+            return "\n".join(lines) + "\n"
+
+def label_string(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def counter(lines: List[str], name: str, help_text: str, labels: tuple, values: Dict[tuple, int]):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for key, value in sorted(values.items()):
+        lines.append(f"{name}{label_string(labels, key)} {value}")
+
+def histogram(lines: List[str], name: str, help_text: str, labels: tuple, histograms: Dict[tuple, Histogram]):
+    lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, hist in sorted(histograms.items()):
+        cumulative = 0
+        for bound, count in zip(hist.buckets, hist.counts):
+            cumulative += count
+            le = f'le="{bound}"'
+            lines.append(f"{name}_bucket{label_string(labels, key, le)} {cumulative}")
+        le = 'le="+Inf"'
+        lines.append(f"{name}_bucket{label_string(labels, key, le)} {hist.count}")
+        lines.append(f"{name}_sum{label_string(labels, key)} {hist.sum}")
+        lines.append(f"{name}_count{label_string(labels, key)} {hist.count}")
+
+metrics_registry = MetricsRegistry()
+
+# Request context
+class RequestMetrics:
+    def __init__(self, profile: bool = False):
+        self.commands: List[tuple] = []
+        # Full command documents, kept only while profiling
+        self.profile = profile
+        self.statements: List[Dict[str, Any]] = []
+
+    def add_statement(self, collection: str, command_name: str, command: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        if not self.profile:
+            return None
+        statement = {
+            "collection": collection,
+            "command": command_name,
+            "body": {key: value for key, value in command.items() if key not in COMMAND_ENVELOPE_FIELDS},
+            "duration_ms": 0.0
+        }
+        self.statements.append(statement)
+        return statement
+
+# Set by the middleware for the duration of a request. Motor runs driver calls
+# in its executor with a copy of the caller's context, so the command listener
+# sees the request that issued the command.
+current_request: ContextVar[Optional[RequestMetrics]] = ContextVar("current_request", default=None)
+
+def reply_document_count(reply: Dict[str, Any]) -> int:
+    cursor = reply.get("cursor")
+    if isinstance(cursor, dict):
+        return len(cursor.get("firstBatch") or cursor.get("nextBatch") or [])
+    if "value" in reply:
+        return 1 if reply["value"] else 0
+    return reply.get("n", 0) if isinstance(reply.get("n"), int) else 0
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    def __init__(self, registry: MetricsRegistry):
+        self.registry = registry
+        self._pending: Dict[tuple, tuple] = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(COLLECTION_ARGUMENTS.get(event.command_name, event.command_name))
+        if not isinstance(collection, str):
+            collection = "-"
+        request_metrics = current_request.get()
+        statement = request_metrics.add_statement(collection, event.command_name, event.command) if request_metrics else None
+        self._pending[(event.connection_id, event.request_id)] = (request_metrics, collection, statement)
+
+    def succeeded(self, event):
+        self._finish(event, reply_document_count(event.reply), failed=False)
+
+    def failed(self, event):
+        self._finish(event, 0, failed=True)
+
+    def _finish(self, event, documents: int, failed: bool):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending is None:
+            return
+        request_metrics, collection, statement = pending
+        command = (collection, event.command_name, event.duration_micros / 1_000_000, documents, failed)
+        if statement is not None:
+            statement["duration_ms"] = round(event.duration_micros / 1000, 3)
+        if request_metrics is not None:
+            request_metrics.commands.append(command)
+        else:
+            self.registry.command_finished("-", *command)
+
+mongo_command_listener = MongoCommandListener(metrics_registry)
+
+# Query profiling
+def query_shape(value: Any) -> Any:
+    # Keeps the structure of a filter or pipeline and drops its values, so
+    # the same query issued for different ids has one shape
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [query_shape(item) for item in value]
+    return "?"
+
+def statement_shape(statement: Dict[str, Any]) -> str:
+    body = statement["body"]
+    parts = {key: body.get(key) for key in ("filter", "query", "pipeline", "q", "updates", "deletes", "sort") if key in body}
+    return f"{statement['collection']}.{statement['command']} {json.dumps(query_shape(parts), sort_keys=True)}"
+
+def plan_stages(plan: Any) -> List[str]:
+    stages = []
+    while isinstance(plan, dict):
+        if plan.get("stage"):
+            stages.append(plan["stage"])
+        plan = plan.get("inputStage") or (plan.get("inputStages") or [None])[0] or plan.get("queryPlan")
+    return stages
+
+def winning_plan(explanation: Dict[str, Any]) -> Any:
+    planner = explanation.get("queryPlanner")
+    if planner is None:
+        # Aggregations nest the planner output under their first stage
+        for stage in explanation.get("stages", []):
+            planner = stage.get("$cursor", {}).get("queryPlanner")
+            if planner:
+                break
+    return (planner or {}).get("winningPlan")
+
+
+class QueryProfiler:
+    """Flags requests that issue too many Mongo commands, repeat one query
+    shape (the N+1 pattern) or exceed a latency budget.
+
+    For each flagged request the offending queries are explained in the
+    background, after the response has gone out, and written as one JSON line
+    to a size-rotated log. `explain` is supplied by the server and runs a raw
+    explain command against its database.
+    """
+
+    def __init__(self, enabled: bool, max_commands: int, latency_budget_ms: float, repeat_threshold: int, log_path: str):
+        self.enabled = enabled
+        self.max_commands = max_commands
+        self.latency_budget_ms = latency_budget_ms
+        self.repeat_threshold = repeat_threshold
+        self.log_path = log_path
+        self.explain: Optional[Callable] = None
+        self.flagged: Dict[str, int] = {}
+        self._logger: Optional[logging.Logger] = None
+        self._tasks: set = set()
+
+    def review(self, route: str, method: str, status: int, seconds: float, request_metrics: RequestMetrics):
+        statements = request_metrics.statements
+        shapes: Dict[str, List[Dict[str, Any]]] = {}
+        for statement in statements:
+            shapes.setdefault(statement_shape(statement), []).append(statement)
+        repeated = {shape: items for shape, items in shapes.items() if len(items) >= self.repeat_threshold}
+
+        reasons = []
+        if len(statements) > self.max_commands:
+            reasons.append("too_many_commands")
+        if repeated:
+            reasons.append("repeated_query")
+        if seconds * 1000 > self.latency_budget_ms:
+            reasons.append("over_latency_budget")
+        if not reasons:
+            return
+
+        for reason in reasons:
+            self.flagged[reason] = self.flagged.get(reason, 0) + 1
+        report = {
+            "at": datetime.now(timezone.utc).isoformat(),
+            "route": route,
+            "method": method,
+            "status": status,
+            "duration_ms": round(seconds * 1000, 3),
+            "commands": len(statements),
+            "reasons": reasons,
+            "repeated": [{"shape": shape, "count": len(items)} for shape, items in repeated.items()]
+        }
+        # One representative per repeated shape, then the slowest of the rest
+        repeated_ids = {id(statement) for items in repeated.values() for statement in items}
+        suspects = [items[0] for items in repeated.values()]
+        suspects += sorted(
+            (statement for statement in statements if id(statement) not in repeated_ids),
+            key=lambda statement: statement["duration_ms"],
+            reverse=True
+        )
+        suspects = [s for s in suspects if s["command"] in EXPLAINABLE_COMMANDS][:PROFILE_EXPLAIN_LIMIT]
+
+        task = asyncio.get_running_loop().create_task(self.capture(report, suspects))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def capture(self, report: Dict[str, Any], suspects: List[Dict[str, Any]]):
+        queries = []
+        for statement in suspects:
+            query = {
+                "collection": statement["collection"],
+                "command": statement["command"],
+                "duration_ms": statement["duration_ms"],
+                "shape": statement_shape(statement)
+            }
+            if self.explain is not None:
+                try:
+                    explanation = await self.explain({"explain": statement["body"], "verbosity": "queryPlanner"})
+                    stages = plan_stages(winning_plan(explanation))
+                    query["plan"] = stages
+                    query["collscan"] = "COLLSCAN" in stages
+                except Exception as e:
+                    query["explain_error"] = str(e)
+            queries.append(query)
+        report["queries"] = queries
+        self.log(report)
+
+    def log(self, report: Dict[str, Any]):
+        if self._logger is None:
+            self._logger = logging.getLogger("query_profile")
+            self._logger.propagate = False
+            self._logger.setLevel(logging.INFO)
+            handler = RotatingFileHandler(self.log_path, maxBytes=PROFILE_LOG_MAX_BYTES, backupCount=PROFILE_LOG_BACKUPS)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(handler)
+        self._logger.info(json.dumps(report, default=str))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "max_commands": self.max_commands,
+            "latency_budget_ms": self.latency_budget_ms,
+            "repeat_threshold": self.repeat_threshold,
+            "log_path": self.log_path,
+            "flagged": dict(self.flagged)
+        }
+
+query_profiler = QueryProfiler(
+    PROFILE_QUERIES,
+    PROFILE_MAX_COMMANDS,
+    PROFILE_LATENCY_BUDGET_MS,
+    PROFILE_REPEAT_THRESHOLD,
+    PROFILE_LOG_PATH
+)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight requests.
+
+    Latency runs until the response body is complete, so streaming routes
+    (NDJSON, server-sent events) report the length of the whole stream.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._route_paths: Dict[Any, str] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_metrics = RequestMetrics(profile=query_profiler.enabled)
+        token = current_request.set(request_metrics)
+        status = [500]
+        streaming = [False]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                streaming[0] = any(
+                    name == b"content-type" and value.startswith(b"text/event-stream")
+                    for name, value in message.get("headers", [])
+                )
+            await send(message)
+
+        metrics_registry.request_started()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_request.reset(token)
+            seconds = time.perf_counter() - started
+            route = self.route_label(scope)
+            metrics_registry.request_finished(route, scope["method"], status[0], seconds, request_metrics.commands)
+            # An event stream's duration is its connection time, not latency
+            if request_metrics.profile and not streaming[0]:
+                query_profiler.review(route, scope["method"], status[0], seconds, request_metrics)
+
+    def route_label(self, scope) -> str:
+        # The router leaves the matched endpoint in the scope; label by the
+        # route's path template rather than the concrete path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        if endpoint not in self._route_paths:
+            app = scope.get("app")
+            for route in getattr(getattr(app, "router", None), "routes", []):
+                if getattr(route, "endpoint", None) is endpoint:
+                    self._route_paths[endpoint] = route.path
+                    break
+            else:
+                self._route_paths[endpoint] = getattr(endpoint, "__name__", "unknown")
+        return self._route_paths[endpoint]
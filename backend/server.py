@@ -1,29 +1,100 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Header
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Request, Response, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel, UpdateOne, ReplaceOne, ReturnDocument
+from pymongo.errors import OperationFailure, BulkWriteError, DuplicateKeyError
 import os
+import asyncio
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, ValidationError, create_model
+from typing import List, Optional, Dict, Any, Union
 import uuid
+import json
+import base64
+import codecs
+import csv
+import io
+import zlib
+import hashlib
 from datetime import datetime, timezone, timedelta
 import httpx
 from enum import Enum
+from collections import OrderedDict, deque
+from functools import lru_cache
+from itertools import chain
+import importlib.util
+import random
+import re
+import time
+import unicodedata
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from chat import create_chat_router, conversation_cache, CHAT_INDEXES, CHAT_QUERY_SHAPES
+from metrics import MetricsMiddleware, metrics_registry, mongo_command_listener, query_profiler
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True, event_listeners=[mongo_command_listener])
 db = client[os.environ['DB_NAME']]
 
-app = FastAPI()
+# JSON encoding
+# With FAST_JSON (the default when orjson is installed) responses are encoded
+# with orjson, and list routes hand documents that were validated on the way
+# in straight to the encoder instead of rebuilding models and re-validating
+# them against response_model.
+FAST_JSON = orjson is not None and os.environ.get('FAST_JSON', 'true').lower() == 'true'
+
+def json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_dumps(value: Any) -> bytes:
+    if FAST_JSON:
+        return orjson.dumps(value, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, default=json_default).encode()
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+app = FastAPI(default_response_class=FastJSONResponse if FAST_JSON else JSONResponse)
 api_router = APIRouter(prefix="/api")
 
-EMERGENT_AUTH_URL = "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data"
+EMERGENT_AUTH_URL = os.environ.get('EMERGENT_AUTH_URL', "https://demobackend.emergentagent.com/auth/v1/env/oauth/session-data")
+AUTH_HTTP_TIMEOUT = float(os.environ.get('AUTH_HTTP_TIMEOUT', '5'))
+AUTH_HTTP_RETRIES = int(os.environ.get('AUTH_HTTP_RETRIES', '2'))
+AUTH_HTTP_MAX_CONNECTIONS = int(os.environ.get('AUTH_HTTP_MAX_CONNECTIONS', '20'))
+AUTH_EXCHANGE_TTL = float(os.environ.get('AUTH_EXCHANGE_TTL', '60'))
+
+PAGE_SIZE_DEFAULT = int(os.environ.get('PAGE_SIZE_DEFAULT', '1000'))
+PAGE_SIZE_MAX = int(os.environ.get('PAGE_SIZE_MAX', '5000'))
+STREAM_BATCH_SIZE = 500
+SEARCH_PAGE_SIZE_DEFAULT = 20
+SEARCH_PAGE_SIZE_MAX = 100
+SEARCH_MAX_OFFSET = 1000
+BULK_MAX_OPERATIONS = 500
+IMPORT_BATCH_SIZE = 500
+IMPORT_MAX_ERRORS = 1000
+
+ARCHIVE_AFTER_DAYS = int(os.environ.get('ARCHIVE_AFTER_DAYS', '90'))
+ARCHIVE_INTERVAL_SECONDS = float(os.environ.get('ARCHIVE_INTERVAL_SECONDS', '3600'))
+ARCHIVE_BATCH_SIZE = int(os.environ.get('ARCHIVE_BATCH_SIZE', '500'))
+
+REALTIME_SOURCE = os.environ.get('REALTIME_SOURCE', 'local')
+REALTIME_HEARTBEAT_SECONDS = float(os.environ.get('REALTIME_HEARTBEAT_SECONDS', '15'))
+REALTIME_QUEUE_SIZE = 256
+REALTIME_BUFFER_SIZE = 500
+REALTIME_MAX_USERS = 10000
 
 # Enums
 class TaskCategory(str, Enum):
@@ -51,6 +122,38 @@ class TimeEntryType(str, Enum):
     POMODORO = "pomodoro"
     MANUAL = "manual"
 
+class BulkOperationType(str, Enum):
+    CREATE = "create"
+    UPDATE = "update"
+    DELETE = "delete"
+
+class RollupPeriod(str, Enum):
+    DAY = "day"
+    WEEK = "week"
+
+class ReportGroupBy(str, Enum):
+    TOTAL = "total"
+    CATEGORY = "category"
+    TASK = "task"
+    SPRINT = "sprint"
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+class DataCollection(str, Enum):
+    SPRINTS = "sprints"
+    TASKS = "tasks"
+    TIME_ENTRIES = "time_entries"
+
+class TaskSortField(str, Enum):
+    CREATED_AT = "created_at"
+    UPDATED_AT = "updated_at"
+
+class SortOrder(str, Enum):
+    ASC = "asc"
+    DESC = "desc"
+
 # Models
 class UserSettings(BaseModel):
     pomodoro_duration: int = 25
@@ -103,6 +206,33 @@ class Task(BaseModel):
     created_at: datetime
     updated_at: datetime
     completed_at: Optional[datetime] = None
+    archived_at: Optional[datetime] = None
+
+class TaskSearchResult(Task):
+    score: Optional[float] = None
+
+class BulkTaskOperation(BaseModel):
+    op: BulkOperationType
+    task_id: Optional[str] = None
+    task: Optional[TaskCreate] = None
+    changes: Optional[TaskUpdate] = None
+
+class BulkTaskRequest(BaseModel):
+    operations: List[BulkTaskOperation] = Field(..., min_length=1, max_length=BULK_MAX_OPERATIONS)
+
+class BulkTaskResult(BaseModel):
+    index: int
+    op: BulkOperationType
+    task_id: Optional[str] = None
+    status: int
+    error: Optional[str] = None
+    task: Optional[Task] = None
+
+class BulkTaskResponse(BaseModel):
+    results: List[BulkTaskResult]
+    created: int = 0
+    updated: int = 0
+    deleted: int = 0
 
 class SprintCreate(BaseModel):
     name: str
@@ -126,6 +256,13 @@ class TimeEntryCreate(BaseModel):
     duration: int
     entry_type: TimeEntryType = TimeEntryType.MANUAL
 
+class TimeEntryBatchItem(TimeEntryCreate):
+    idempotency_key: str = Field(..., min_length=1, max_length=128)
+    end_time: Optional[datetime] = None
+
+class TimeEntryBatchRequest(BaseModel):
+    entries: List[TimeEntryBatchItem] = Field(..., min_length=1, max_length=BULK_MAX_OPERATIONS)
+
 class TimeEntry(BaseModel):
     model_config = ConfigDict(extra="ignore")
     entry_id: str
@@ -135,9 +272,263 @@ class TimeEntry(BaseModel):
     end_time: datetime
     duration: int
     entry_type: TimeEntryType
+    idempotency_key: Optional[str] = None
     created_at: datetime
+    archived_at: Optional[datetime] = None
+
+# Import rows are validated against the create models; the extra fields carry
+# the state an exported document had, which a create request cannot set
+class SprintImport(SprintCreate):
+    model_config = ConfigDict(extra="ignore")
+    status: SprintStatus = SprintStatus.ACTIVE
+    created_at: Optional[datetime] = None
+
+class TaskImport(TaskCreate):
+    model_config = ConfigDict(extra="ignore")
+    status: TaskStatus = TaskStatus.TODO
+    actual_time: int = Field(0, ge=0)
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+class TimeEntryImport(TimeEntryCreate):
+    model_config = ConfigDict(extra="ignore")
+    end_time: Optional[datetime] = None
+    created_at: Optional[datetime] = None
+
+class ImportRowError(BaseModel):
+    line: int
+    collection: Optional[str] = None
+    error: str
+
+class ImportResponse(BaseModel):
+    imported: Dict[str, int]
+    error_count: int
+    errors: List[ImportRowError]
+
+class TimeEntryBatchResult(BaseModel):
+    index: int
+    idempotency_key: str
+    status: int
+    entry_id: Optional[str] = None
+    error: Optional[str] = None
+
+class TimeEntryBatchResponse(BaseModel):
+    results: List[TimeEntryBatchResult]
+    created: int = 0
+    duplicates: int = 0
+
+# Session Cache
+class SessionCache:
+    """Bounded LRU + TTL cache mapping session tokens to resolved users.
+
+    Entries live for at most `ttl` seconds and never outlive the session's own
+    expires_at. The cache is per-process, so the TTL also bounds how long a
+    session revoked through another worker can keep resolving here.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[str, set] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, session_token: str) -> Optional["User"]:
+        entry = self._entries.get(session_token)
+        if entry is None:
+            self.misses += 1
+            return None
+        user, session_expires_at, cached_until = entry
+        now = time.monotonic()
+        if now >= cached_until or session_expires_at < datetime.now(timezone.utc):
+            self._remove(session_token)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(session_token)
+        self.hits += 1
+        return user
+
+    def set(self, session_token: str, user: "User", session_expires_at: datetime):
+        if self.max_size <= 0:
+            return
+        if session_token in self._entries:
+            self._remove(session_token)
+        self._entries[session_token] = (user, session_expires_at, time.monotonic() + self.ttl)
+        self._tokens_by_user.setdefault(user.user_id, set()).add(session_token)
+        while len(self._entries) > self.max_size:
+            oldest_token = next(iter(self._entries))
+            self._remove(oldest_token)
+            self.evictions += 1
+
+    def invalidate(self, session_token: str):
+        if session_token in self._entries:
+            self._remove(session_token)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: str):
+        for session_token in list(self._tokens_by_user.get(user_id, ())):
+            self.invalidate(session_token)
+
+    def clear(self):
+        self._entries.clear()
+        self._tokens_by_user.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+    def _remove(self, session_token: str):
+        user, _, _ = self._entries.pop(session_token)
+        tokens = self._tokens_by_user.get(user.user_id)
+        if tokens is not None:
+            tokens.discard(session_token)
+            if not tokens:
+                del self._tokens_by_user[user.user_id]
+
+session_cache = SessionCache(
+    max_size=int(os.environ.get('SESSION_CACHE_SIZE', '10000')),
+    ttl=float(os.environ.get('SESSION_CACHE_TTL', '60'))
+)
+
+# Upstream HTTP
+# One pooled client for the app's lifetime so logins reuse keep-alive
+# connections to the auth provider instead of opening a new TLS connection
+# each time. HTTP/2 is used when the optional h2 package is installed.
+http_client: Optional[httpx.AsyncClient] = None
+
+def get_http_client() -> httpx.AsyncClient:
+    global http_client
+    if http_client is None or http_client.is_closed:
+        http_client = httpx.AsyncClient(
+            http2=importlib.util.find_spec("h2") is not None,
+            timeout=httpx.Timeout(AUTH_HTTP_TIMEOUT, connect=min(AUTH_HTTP_TIMEOUT, 3.0)),
+            limits=httpx.Limits(
+                max_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=AUTH_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=30
+            )
+        )
+    return http_client
+
+def retry_delay(attempt: int, base: float = 0.1, cap: float = 2.0) -> float:
+    # Exponential backoff with full jitter
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+async def get_with_retries(url: str, headers: Dict[str, str], retries: int = AUTH_HTTP_RETRIES) -> httpx.Response:
+    """GET with retries on transport errors, 429 and 5xx; other errors raise at once."""
+    for attempt in range(retries + 1):
+        try:
+            response = await get_http_client().get(url, headers=headers)
+            if response.status_code != 429 and response.status_code < 500:
+                break
+            if attempt == retries:
+                break
+        except httpx.TransportError:
+            if attempt == retries:
+                raise
+        await asyncio.sleep(retry_delay(attempt))
+    response.raise_for_status()
+    return response
+
+class SessionExchangeCache:
+    """Short-lived results of exchanging an OAuth session_id for session data.
+
+    A double-submitted callback joins the in-flight exchange, or reuses its
+    result for `ttl` seconds, instead of calling the auth provider again.
+    Failed exchanges are not kept.
+    """
+
+    def __init__(self, ttl: float = 60.0):
+        self.ttl = ttl
+        self._entries: Dict[str, tuple] = {}
+        self.upstream_calls = 0
+        self.deduplicated = 0
+
+    async def get(self, session_id: str) -> Dict[str, Any]:
+        now = time.monotonic()
+        for key in [key for key, (_, expires) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+        entry = self._entries.get(session_id)
+        if entry is not None:
+            self.deduplicated += 1
+            return await asyncio.shield(entry[0])
+
+        future = asyncio.ensure_future(self._exchange(session_id))
+        self._entries[session_id] = (future, now + self.ttl)
+        future.add_done_callback(lambda done: self._forget_failed(session_id, done))
+        return await asyncio.shield(future)
+
+    def _forget_failed(self, session_id: str, future: asyncio.Future):
+        # A callback rather than an except clause, so the entry also goes when
+        # the request that started the exchange was cancelled before it failed
+        if future.cancelled() or future.exception() is not None:
+            entry = self._entries.get(session_id)
+            if entry is not None and entry[0] is future:
+                del self._entries[session_id]
+
+    async def _exchange(self, session_id: str) -> Dict[str, Any]:
+        self.upstream_calls += 1
+        response = await get_with_retries(EMERGENT_AUTH_URL, {"X-Session-ID": session_id})
+        return response.json()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "ttl_seconds": self.ttl,
+            "upstream_calls": self.upstream_calls,
+            "deduplicated": self.deduplicated
+        }
+
+session_exchange_cache = SessionExchangeCache(ttl=AUTH_EXCHANGE_TTL)
 
 # Helper Functions
+def as_utc(value: Union[datetime, str]) -> datetime:
+    # Documents written before `manage.py migrate-dates` may still hold the
+    # isoformat() strings older versions stored
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+# None until the first attempt tells us whether the deployment is a replica set
+transactions_supported: Optional[bool] = None
+
+async def run_in_transaction(callback):
+    """Run `callback(session)` in a transaction, retrying transient errors.
+
+    A standalone mongod cannot run transactions; there the callback runs once
+    with session=None and the caller's idempotency guarantees have to suffice.
+    """
+    global transactions_supported
+    if transactions_supported is not False:
+        try:
+            async with await client.start_session() as session:
+                result = await session.with_transaction(callback)
+            transactions_supported = True
+            return result
+        except OperationFailure as e:
+            # IllegalOperation: transactions need a replica set or mongos
+            if e.code != 20:
+                raise
+            transactions_supported = False
+            logger.warning("MongoDB deployment does not support transactions; running writes without one")
+    return await callback(None)
+
 async def get_current_user(request: Request, authorization: Optional[str] = Header(None)) -> User:
     session_token = request.cookies.get("session_token")
     
@@ -148,15 +539,15 @@ async def get_current_user(request: Request, authorization: Optional[str] = Head
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
     
+    cached_user = session_cache.get(session_token)
+    if cached_user is not None:
+        return cached_user
+    
     session_doc = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
     if not session_doc:
         raise HTTPException(status_code=401, detail="Invalid session")
     
-    expires_at = session_doc["expires_at"]
-    if isinstance(expires_at, str):
-        expires_at = datetime.fromisoformat(expires_at)
-    if expires_at.tzinfo is None:
-        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    expires_at = as_utc(session_doc["expires_at"])
     if expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=401, detail="Session expired")
     
@@ -164,62 +555,676 @@ async def get_current_user(request: Request, authorization: Optional[str] = Head
     if not user_doc:
         raise HTTPException(status_code=404, detail="User not found")
     
-    if isinstance(user_doc.get("created_at"), str):
-        user_doc["created_at"] = datetime.fromisoformat(user_doc["created_at"])
+    user = User(**user_doc)
+    session_cache.set(session_token, user, expires_at)
+    return user
+
+# Pagination
+# List endpoints page by keyset on (<sort field>, <id field>), where the sort
+# field is a date that every document carries. The cursor is opaque to clients
+# and is returned in the X-Next-Cursor header so the response body stays a
+# plain list.
+def encode_cursor(doc: Dict[str, Any], sort_field: str, id_field: str) -> str:
+    payload = json.dumps({"f": sort_field, "v": as_utc(doc[sort_field]).isoformat(), "i": doc[id_field]})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def cursor_filter(cursor: str, sort_field: str, id_field: str, direction: int = DESCENDING) -> Dict[str, Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        last_value = datetime.fromisoformat(payload["v"])
+        last_id = str(payload["i"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("f") != sort_field:
+        raise HTTPException(status_code=400, detail="Cursor does not match the requested sort")
+    
+    op = "$lt" if direction == DESCENDING else "$gt"
+    return {"$or": [
+        {sort_field: {op: last_value}},
+        {sort_field: last_value, id_field: {op: last_id}}
+    ]}
+
+async def fetch_page(cursors: List[Any], response: Response, limit: int, sort_field: str, id_field: str, direction: int = DESCENDING) -> List[Dict[str, Any]]:
+    # Several cursors (a collection and its archive) are merged on the keyset
+    batches = await asyncio.gather(*(cursor.limit(limit + 1).to_list(length=limit + 1) for cursor in cursors))
+    docs = batches[0]
+    if len(batches) > 1:
+        docs = sorted(chain.from_iterable(batches), key=lambda doc: (doc[sort_field], doc[id_field]), reverse=direction == DESCENDING)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(docs[-1], sort_field, id_field)
+    return docs
+
+# Sparse fieldsets
+# ?fields=a,b,c narrows list responses to the named model fields (plus the
+# document id). The fields become the Mongo projection, and documents are
+# validated against a trimmed copy of the model instead of the full one.
+def parse_fields(fields: Optional[str], model: type, id_field: str) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys([id_field, *requested]))
+
+# Derived or bookkeeping fields stored on documents, never returned
+INTERNAL_FIELDS = ("search_words", "credited")
+
+def fields_projection(selected: Optional[List[str]], *extra: str) -> Dict[str, int]:
+    if selected is None:
+        return {"_id": 0, **{name: 0 for name in INTERNAL_FIELDS}}
+    return {"_id": 0, **{name: 1 for name in (*selected, *extra)}}
+
+@lru_cache(maxsize=256)
+def sparse_model(model: type, fields: tuple) -> type:
+    return create_model(
+        f"{model.__name__}Fields",
+        __config__=ConfigDict(extra="ignore"),
+        **{name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    )
+
+def list_response(model: type, docs: List[Dict[str, Any]], response: Response, selected: Optional[List[str]] = None):
+    # Stored documents were validated when written, so the fast path encodes
+    # them as they are, only dropping the sort key a cursor needed projected
+    if FAST_JSON:
+        if selected:
+            docs = [{name: doc[name] for name in selected if name in doc} for doc in docs]
+        return FastJSONResponse(docs, headers=dict(response.headers))
+    if selected:
+        partial = sparse_model(model, tuple(selected))
+        return JSONResponse(
+            content=[partial(**doc).model_dump(mode="json") for doc in docs],
+            headers=dict(response.headers)
+        )
+    return [model(**doc) for doc in docs]
+
+def date_range_filter(after: Optional[datetime], before: Optional[datetime]) -> Optional[Dict[str, datetime]]:
+    bounds = {}
+    if after:
+        bounds["$gte"] = as_utc(after)
+    if before:
+        bounds["$lt"] = as_utc(before)
+    return bounds or None
+
+async def chain_cursors(cursors: List[Any]):
+    for cursor in cursors:
+        async for doc in cursor.batch_size(STREAM_BATCH_SIZE):
+            yield doc
+
+def ndjson_response(cursors: List[Any], headers: Optional[Dict[str, str]] = None) -> StreamingResponse:
+    # Cursors are streamed one after the other, so archived documents follow
+    # the live ones rather than being interleaved in sort order
+    async def generate():
+        async for doc in chain_cursors(cursors):
+            yield json_dumps(doc) + b"\n"
+    return StreamingResponse(generate(), media_type="application/x-ndjson", headers=headers)
+
+# User Stats
+# Dashboard counters are materialized per user in `user_stats` and kept current
+# with $inc from the write routes. Writes never upsert: a missing document is
+# built from scratch by rebuild_user_stats on the next dashboard read, so
+# counters never start from a partial state.
+def stats_day_key(value: datetime) -> str:
+    return as_utc(value).strftime("%Y-%m-%d")
+
+def task_stats_contribution(task_doc: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    if not task_doc:
+        return {}
+    if task_doc.get("status") != TaskStatus.DONE.value:
+        category = getattr(task_doc.get("category"), "value", task_doc.get("category"))
+        return {"open_tasks": 1, f"open_by_category.{category}": 1}
+    if task_doc.get("completed_at"):
+        return {f"completed_by_day.{stats_day_key(task_doc['completed_at'])}": 1}
+    return {}
+
+def task_stats_delta(old_doc: Optional[Dict[str, Any]], new_doc: Optional[Dict[str, Any]]) -> Dict[str, int]:
+    delta = dict(task_stats_contribution(new_doc))
+    for key, value in task_stats_contribution(old_doc).items():
+        delta[key] = delta.get(key, 0) - value
+    return {key: value for key, value in delta.items() if value}
+
+async def apply_user_stats(user_id: str, inc: Dict[str, int]):
+    if not inc:
+        return
+    await db.user_stats.update_one(
+        {"user_id": user_id},
+        {"$inc": inc, "$set": {"updated_at": datetime.now(timezone.utc)}}
+    )
+
+async def legacy_day_buckets(
+    collection, query: Dict[str, Any], date_field: str, output: str, amount_field: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    # $dateToString rejects the isoformat() strings left by older versions, so
+    # until `manage.py migrate-dates` has run those documents are bucketed here
+    buckets: Dict[str, int] = {}
+    projection = {"_id": 0, date_field: 1, **({amount_field: 1} if amount_field else {})}
+    async for doc in collection.find({**query, date_field: {"$type": "string"}}, projection):
+        day = stats_day_key(doc[date_field])
+        buckets[day] = buckets.get(day, 0) + (doc.get(amount_field) or 0 if amount_field else 1)
+    return [{"_id": day, output: value} for day, value in buckets.items()]
+
+async def rebuild_user_stats(user_id: str) -> Dict[str, Any]:
+    tasks_pipeline = [
+        {"$match": {"user_id": user_id}},
+        {"$facet": {
+            "open_by_category": [
+                {"$match": {"status": {"$ne": TaskStatus.DONE.value}}},
+                {"$group": {"_id": "$category", "count": {"$sum": 1}}}
+            ],
+            "completed_by_day": [
+                {"$match": {"status": TaskStatus.DONE.value, "completed_at": {"$type": "date"}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$completed_at"}},
+                    "count": {"$sum": 1}
+                }}
+            ]
+        }}
+    ]
+    
+    # Archived tasks are all done, so they only add to the completion history
+    archived_pipeline = [
+        {"$match": {"user_id": user_id, "completed_at": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$completed_at"}},
+            "count": {"$sum": 1}
+        }}
+    ]
+    
+    time_pipeline = [
+        {"$match": {"user_id": user_id, "start_time": {"$type": "date"}}},
+        {"$group": {
+            "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$start_time"}},
+            "minutes": {"$sum": "$duration"}
+        }}
+    ]
+    
+    (
+        task_facets, archived_completed_by_day, minutes_by_day, archived_minutes_by_day, active_sprints,
+        legacy_completed_by_day, legacy_minutes_by_day
+    ) = await asyncio.gather(
+        db.tasks.aggregate(tasks_pipeline).to_list(length=1),
+        db.tasks_archive.aggregate(archived_pipeline).to_list(length=None),
+        db.time_entries.aggregate(time_pipeline).to_list(length=None),
+        db.time_entries_archive.aggregate(time_pipeline).to_list(length=None),
+        db.sprints.count_documents({"user_id": user_id, "status": SprintStatus.ACTIVE.value}),
+        legacy_day_buckets(db.tasks, {"user_id": user_id, "status": TaskStatus.DONE.value}, "completed_at", "count"),
+        legacy_day_buckets(db.time_entries, {"user_id": user_id}, "start_time", "minutes", "duration")
+    )
+    
+    facets = task_facets[0] if task_facets else {"open_by_category": [], "completed_by_day": []}
+    open_by_category = {category.value: 0 for category in TaskCategory}
+    for bucket in facets["open_by_category"]:
+        open_by_category[bucket["_id"]] = bucket["count"]
+    
+    completed = {}
+    for bucket in facets["completed_by_day"] + archived_completed_by_day + legacy_completed_by_day:
+        completed[bucket["_id"]] = completed.get(bucket["_id"], 0) + bucket["count"]
+    minutes = {}
+    for bucket in minutes_by_day + archived_minutes_by_day + legacy_minutes_by_day:
+        minutes[bucket["_id"]] = minutes.get(bucket["_id"], 0) + bucket["minutes"]
+    
+    stats_doc = {
+        "user_id": user_id,
+        "open_tasks": sum(open_by_category.values()),
+        "open_by_category": open_by_category,
+        "completed_by_day": completed,
+        "minutes_by_day": minutes,
+        "active_sprints": active_sprints,
+        "updated_at": datetime.now(timezone.utc)
+    }
+    
+    await db.user_stats.replace_one({"user_id": user_id}, dict(stats_doc), upsert=True)
+    return stats_doc
+
+# Time Rollups
+# Minutes are pre-aggregated per user into one document per day and per ISO
+# week, broken down by category, task and sprint, so time reports read one
+# small document per bucket instead of scanning raw time entries.
+ROLLUP_GROUP_FIELDS = {
+    ReportGroupBy.CATEGORY: "by_category",
+    ReportGroupBy.TASK: "by_task",
+    ReportGroupBy.SPRINT: "by_sprint"
+}
+UNASSIGNED_SPRINT = "unassigned"
+
+def rollup_bucket_start(value: datetime, period: RollupPeriod) -> datetime:
+    day = as_utc(value).replace(hour=0, minute=0, second=0, microsecond=0)
+    if period == RollupPeriod.WEEK:
+        return day - timedelta(days=day.weekday())
+    return day
+
+def time_rollup_increments(entry_doc: Dict[str, Any], task_doc: Dict[str, Any]) -> List[tuple]:
+    category = getattr(task_doc.get("category"), "value", task_doc.get("category"))
+    sprint_id = task_doc.get("sprint_id") or UNASSIGNED_SPRINT
+    duration = entry_doc["duration"]
+    inc = {
+        "minutes": duration,
+        "entries": 1,
+        f"by_category.{category}": duration,
+        f"by_task.{entry_doc['task_id']}": duration,
+        f"by_sprint.{sprint_id}": duration
+    }
+    return [(period, rollup_bucket_start(entry_doc["start_time"], period), inc) for period in RollupPeriod]
+
+async def apply_time_rollups(user_id: str, increments: List[tuple]):
+    merged: Dict[tuple, Dict[str, int]] = {}
+    for period, bucket_start, inc in increments:
+        bucket = merged.setdefault((period.value, bucket_start), {})
+        for key, value in inc.items():
+            bucket[key] = bucket.get(key, 0) + value
+    if not merged:
+        return
+    await db.time_rollups.bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id, "period": period, "bucket_start": bucket_start},
+                {"$inc": inc},
+                upsert=True
+            )
+            for (period, bucket_start), inc in merged.items()
+        ],
+        ordered=False
+    )
+
+async def rebuild_time_rollups(user_id: str) -> int:
+    task_meta = {}
+    for collection in (db.tasks, db.tasks_archive):
+        async for task_doc in collection.find({"user_id": user_id}, {"_id": 0, "task_id": 1, "category": 1, "sprint_id": 1}):
+            task_meta[task_doc["task_id"]] = task_doc
+    
+    increments = []
+    for collection in (db.time_entries, db.time_entries_archive):
+        async for entry_doc in collection.find({"user_id": user_id}, {"_id": 0, "task_id": 1, "start_time": 1, "duration": 1}):
+            task_doc = task_meta.get(entry_doc["task_id"], {"category": "deleted"})
+            increments.extend(time_rollup_increments(entry_doc, task_doc))
+    
+    await db.time_rollups.delete_many({"user_id": user_id})
+    await apply_time_rollups(user_id, increments)
+    return len(increments) // len(RollupPeriod)
+
+# Task Events
+# Task writes append the before/after state of the fields that drive sprint
+# analytics. Burndown is derived from this log because tasks themselves only
+# keep their latest state.
+TASK_EVENT_FIELDS = ("status", "estimated_time", "sprint_id")
+# Upper bound on how long after its `at` an event can be inserted
+TASK_EVENT_MAX_LAG = timedelta(minutes=5)
+
+def task_event_state(task_doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not task_doc:
+        return None
+    return {field: getattr(task_doc.get(field), "value", task_doc.get(field)) for field in TASK_EVENT_FIELDS}
+
+def task_event(user_id: str, old_doc: Optional[Dict[str, Any]], new_doc: Optional[Dict[str, Any]], at: datetime) -> Optional[Dict[str, Any]]:
+    before, after = task_event_state(old_doc), task_event_state(new_doc)
+    if before == after:
+        return None
+    sprints = {state["sprint_id"] for state in (before, after) if state and state["sprint_id"]}
+    return {
+        "user_id": user_id,
+        "task_id": (new_doc or old_doc)["task_id"],
+        "at": at,
+        "sprints": sorted(sprints),
+        "before": before,
+        "after": after
+    }
+
+async def append_task_events(events: List[Dict[str, Any]]):
+    if events:
+        await db.task_events.insert_many(events, ordered=False)
+
+# Realtime
+class ChangeBroker:
+    """In-process pub/sub of per-user change notifications.
+
+    Each user gets a sequence number and a ring buffer of recent changes, so a
+    client that reconnects with its last event id is replayed what it missed.
+    Event ids carry this process's instance id; an id from another process, or
+    one older than the buffer, tells the client to reset and refetch instead.
+    A subscriber whose queue fills up is cut off the same way rather than
+    letting a slow client hold memory.
+    """
+
+    def __init__(self, queue_size: int, buffer_size: int, max_users: int):
+        self.instance_id = uuid.uuid4().hex[:8]
+        self.queue_size = queue_size
+        self.buffer_size = buffer_size
+        self.max_users = max_users
+        self._sequences: Dict[str, int] = {}
+        self._buffers: "OrderedDict[str, deque]" = OrderedDict()
+        self._subscribers: Dict[str, set] = {}
+        self.published = 0
+        self.overflows = 0
+
+    def publish(self, user_id: str, kind: str, action: str, data: Dict[str, Any]):
+        seq = self._sequences.get(user_id, 0) + 1
+        self._sequences[user_id] = seq
+        event = {"id": f"{self.instance_id}-{seq}", "seq": seq, "kind": kind, "action": action, "data": data}
+        
+        buffer = self._buffers.get(user_id)
+        if buffer is None:
+            buffer = self._buffers[user_id] = deque(maxlen=self.buffer_size)
+        self._buffers.move_to_end(user_id)
+        buffer.append(event)
+        while len(self._buffers) > self.max_users:
+            evicted_user, _ = self._buffers.popitem(last=False)
+            if evicted_user not in self._subscribers:
+                self._sequences.pop(evicted_user, None)
+        
+        self.published += 1
+        for queue in list(self._subscribers.get(user_id, ())):
+            if queue.overflowed:
+                continue
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                queue.overflowed = True
+                self.overflows += 1
     
-    return User(**user_doc)
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        queue.overflowed = False
+        self._subscribers.setdefault(user_id, set()).add(queue)
+        return queue
+    
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._subscribers.get(user_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[user_id]
+    
+    def replay(self, user_id: str, last_event_id: str) -> Optional[List[Dict[str, Any]]]:
+        # None means the gap cannot be filled from the buffer
+        instance_id, _, seq = last_event_id.partition("-")
+        if instance_id != self.instance_id or not seq.isdigit():
+            return None
+        last_seq = int(seq)
+        buffer = self._buffers.get(user_id, ())
+        if last_seq >= self._sequences.get(user_id, 0):
+            return []
+        if not buffer or buffer[0]["seq"] > last_seq + 1:
+            return None
+        return [event for event in buffer if event["seq"] > last_seq]
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "instance_id": self.instance_id,
+            "source": REALTIME_SOURCE,
+            "subscribers": sum(len(queues) for queues in self._subscribers.values()),
+            "published": self.published,
+            "overflows": self.overflows
+        }
+
+change_broker = ChangeBroker(REALTIME_QUEUE_SIZE, REALTIME_BUFFER_SIZE, REALTIME_MAX_USERS)
+
+def change(kind: str, action: str, doc: Dict[str, Any]) -> tuple:
+    return kind, action, {key: value for key, value in doc.items() if key != "_id" and key not in INTERNAL_FIELDS}
+
+def publish_changes(user_id: str, changes: List[tuple]):
+    # With change streams as the source every write reaches the broker from the
+    # watcher. A delete event only carries the document's user_id through its
+    # pre-image; where the server cannot record pre-images (before MongoDB 6.0)
+    # deletes and archivals are still published by the route, which only
+    # reaches subscribers connected to this process.
+    for kind, action, data in changes:
+        if REALTIME_SOURCE == "change_stream" and (pre_images_enabled or action not in ("deleted", "archived")):
+            continue
+        change_broker.publish(user_id, kind, action, data)
+
+REALTIME_COLLECTIONS = {"tasks": "task", "sprints": "sprint", "time_entries": "time_entry", "matches": "match", "messages": "message"}
+
+# Set at startup once every realtime collection records change stream pre-images
+pre_images_enabled = False
+
+async def enable_change_stream_pre_images() -> bool:
+    for collection_name in REALTIME_COLLECTIONS:
+        try:
+            await db.command("collMod", collection_name, changeStreamPreAndPostImages={"enabled": True})
+        except OperationFailure as e:
+            # NamespaceNotFound: the collection has not been written to yet
+            if e.code != 26:
+                logger.warning(f"Change stream pre-images unavailable, deletes only reach local subscribers: {e}")
+                return False
+            await db.create_collection(collection_name, changeStreamPreAndPostImages={"enabled": True})
+    return True
+
+async def watch_change_streams():
+    # Archival removes tasks and time entries with plain deletes, so it shows
+    # up on the stream as "deleted"
+    pipeline = [{"$match": {
+        "ns.coll": {"$in": list(REALTIME_COLLECTIONS)},
+        "operationType": {"$in": ["insert", "update", "replace", "delete"]}
+    }}]
+    # Servers before 6.0 reject fullDocumentBeforeChange, so it is only asked
+    # for once pre-images were enabled; deletes are then published locally
+    options = {"full_document": "updateLookup"}
+    if pre_images_enabled:
+        options["full_document_before_change"] = "whenAvailable"
+    while True:
+        try:
+            async with db.watch(pipeline, **options) as stream:
+                async for event in stream:
+                    if event["operationType"] == "delete":
+                        doc = event.get("fullDocumentBeforeChange")
+                    else:
+                        doc = event.get("fullDocument")
+                    if not doc:
+                        continue
+                    # Shared documents (matches, messages) go to every participant
+                    recipients = doc.get("participants") or [doc.get("user_id")]
+                    if not all(recipients):
+                        continue
+                    kind = REALTIME_COLLECTIONS[event["ns"]["coll"]]
+                    action = {"insert": "created", "delete": "deleted"}.get(event["operationType"], "updated")
+                    if kind == "message" and action != "deleted":
+                        conversation_cache.ingest(doc)
+                    for user_id in recipients:
+                        change_broker.publish(user_id, *change(kind, action, doc))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Change stream watcher failed, restarting: {e}")
+            await asyncio.sleep(5)
+
+# Change Versions
+# Every write route bumps the user's data version, which is exposed as the ETag
+# of the user's read routes. A matching If-None-Match is answered with 304
+# from a single point read, without running the route's query.
+async def get_user_version(user_id: str) -> int:
+    version_doc = await db.user_versions.find_one({"user_id": user_id}, {"_id": 0, "version": 1})
+    return version_doc["version"] if version_doc else 0
+
+async def bump_user_version(user_id: str):
+    await db.user_versions.update_one(
+        {"user_id": user_id},
+        {"$inc": {"version": 1}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True
+    )
+
+async def record_user_write(
+    user_id: str,
+    stats_inc: Optional[Dict[str, int]] = None,
+    events: Optional[List[Optional[Dict[str, Any]]]] = None,
+    changes: Optional[List[tuple]] = None
+):
+    publish_changes(user_id, changes or [])
+    await asyncio.gather(
+        apply_user_stats(user_id, stats_inc or {}),
+        bump_user_version(user_id),
+        append_task_events([event for event in events or [] if event])
+    )
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    # "*" is not honoured: the check runs before the route knows whether the
+    # resource exists, so it would turn a 404 into a 304
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return etag in candidates or etag.removeprefix("W/") in candidates
+
+async def check_not_modified(request: Request, response: Response, user_id: str, *parts: str) -> Optional[Response]:
+    # The version is per user, so the digest has to tell the user's resources,
+    # filters and pages apart
+    version = await get_user_version(user_id)
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    digest = hashlib.sha1("|".join([user_id, request.url.path, query, *parts]).encode()).hexdigest()[:12]
+    etag = f'W/"{version}-{digest}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+# Archival
+# Tasks completed more than ARCHIVE_AFTER_DAYS ago are moved, with their time
+# entries, into tasks_archive and time_entries_archive, so the hot collections
+# and their indexes only hold the working set. Archived documents keep their
+# _id, gain archived_at and are read-only; list routes return them only with
+# include_archived. Dashboard counters and time rollups already include them
+# and are left untouched. Without transaction support, a batch that fails
+# part-way leaves either a stale archive copy, overwritten on the next run, or
+# an archived task's time entries in time_entries, where they still count.
+ARCHIVE_COLLECTIONS = {"tasks": "tasks_archive", "time_entries": "time_entries_archive"}
+
+def archivable_tasks_filter(cutoff: datetime) -> Dict[str, Any]:
+    return {"status": TaskStatus.DONE.value, "completed_at": {"$lt": cutoff}}
+
+async def copy_to_archive(collection: str, docs: List[Dict[str, Any]], archived_at: datetime, session=None):
+    # Upserts by _id, so a batch interrupted before its deletes can be rerun
+    if docs:
+        await db[ARCHIVE_COLLECTIONS[collection]].bulk_write(
+            [ReplaceOne({"_id": doc["_id"]}, {**doc, "archived_at": archived_at}, upsert=True) for doc in docs],
+            ordered=False,
+            session=session
+        )
+
+async def archive_task_batch(cutoff: datetime, batch_size: int) -> int:
+    archived: Dict[str, List[str]] = {}
+    
+    async def move(session):
+        archived.clear()
+        now = datetime.now(timezone.utc)
+        tasks = await db.tasks.find(archivable_tasks_filter(cutoff), session=session).sort("completed_at", ASCENDING).to_list(length=batch_size)
+        if not tasks:
+            return 0
+        task_ids = [task["_id"] for task in tasks]
+        await copy_to_archive("tasks", tasks, now, session)
+        
+        # A task reopened since it was read no longer matches and stays put
+        result = await db.tasks.delete_many({"_id": {"$in": task_ids}, **archivable_tasks_filter(cutoff)}, session=session)
+        if result.deleted_count < len(tasks):
+            kept = await db.tasks.distinct("_id", {"_id": {"$in": task_ids}}, session=session)
+            await db.tasks_archive.delete_many({"_id": {"$in": kept}}, session=session)
+            tasks = [task for task in tasks if task["_id"] not in set(kept)]
+        if not tasks:
+            return 0
+        
+        entries = await db.time_entries.find({
+            "user_id": {"$in": list({task["user_id"] for task in tasks})},
+            "task_id": {"$in": [task["task_id"] for task in tasks]}
+        }, session=session).to_list(length=None)
+        await copy_to_archive("time_entries", entries, now, session)
+        if entries:
+            await db.time_entries.delete_many({"_id": {"$in": [entry["_id"] for entry in entries]}}, session=session)
+        
+        for task in tasks:
+            archived.setdefault(task["user_id"], []).append(task["task_id"])
+        return len(tasks)
+    
+    count = await run_in_transaction(move)
+    for user_id, task_ids in archived.items():
+        await record_user_write(user_id, changes=[change("task", "archived", {"task_id": task_id}) for task_id in task_ids])
+    return count
+
+async def archive_completed_tasks(after_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    cutoff = datetime.now(timezone.utc) - timedelta(days=after_days)
+    total = 0
+    while True:
+        count = await archive_task_batch(cutoff, batch_size)
+        if not count:
+            return total
+        total += count
+
+async def run_archiver():
+    while True:
+        try:
+            count = await archive_completed_tasks()
+            if count:
+                logger.info(f"Archived {count} completed task(s)")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Archiver failed: {e}")
+        await asyncio.sleep(ARCHIVE_INTERVAL_SECONDS)
 
 # Auth Routes
 @api_router.get("/")
 async def root():
     return {"message": "DevFlow API", "status": "online"}
 
-@api_router.post("/auth/callback")
-async def auth_callback(session_id: str, response: Response):
-    async with httpx.AsyncClient() as client:
+async def upsert_login_user(email: str, name: Optional[str], picture: Optional[str]) -> Dict[str, Any]:
+    update = {
+        "$set": {"name": name, "picture": picture},
+        "$setOnInsert": {
+            "user_id": f"user_{uuid.uuid4().hex[:12]}",
+            "settings": UserSettings().model_dump(),
+            "created_at": datetime.now(timezone.utc)
+        }
+    }
+    for attempt in range(2):
         try:
-            auth_response = await client.get(
-                EMERGENT_AUTH_URL,
-                headers={"X-Session-ID": session_id}
+            return await db.users.find_one_and_update(
+                {"email": email},
+                update,
+                projection={"_id": 0},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
             )
-            auth_response.raise_for_status()
-            auth_data = auth_response.json()
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Failed to get session data: {str(e)}")
+        except DuplicateKeyError:
+            # Lost the insert race to a concurrent login; the retry matches
+            # the user the other request created
+            if attempt:
+                raise
+
+@api_router.post("/auth/callback")
+async def auth_callback(session_id: str, response: Response):
+    try:
+        auth_data = await session_exchange_cache.get(session_id)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Failed to get session data: {str(e)}")
     
     session_token = auth_data.get("session_token")
     email = auth_data.get("email")
     name = auth_data.get("name")
     picture = auth_data.get("picture")
     
-    existing_user = await db.users.find_one({"email": email}, {"_id": 0})
+    if not session_token or not email:
+        raise HTTPException(status_code=400, detail="Incomplete session data")
     
-    if existing_user:
-        user_id = existing_user["user_id"]
-        await db.users.update_one(
-            {"user_id": user_id},
-            {"$set": {"name": name, "picture": picture}}
-        )
-    else:
-        user_id = f"user_{uuid.uuid4().hex[:12]}"
-        user_doc = {
-            "user_id": user_id,
-            "email": email,
-            "name": name,
-            "picture": picture,
-            "settings": UserSettings().model_dump(),
-            "created_at": datetime.now(timezone.utc).isoformat()
-        }
-        await db.users.insert_one(user_doc)
+    # One upsert finds or creates the user; the unique email index makes a
+    # concurrent callback for the same new user fail instead of duplicating it
+    user_data = await upsert_login_user(email, name, picture)
+    session_cache.invalidate_user(user_data["user_id"])
     
     expires_at = datetime.now(timezone.utc) + timedelta(days=7)
     session_doc = {
         "session_token": session_token,
-        "user_id": user_id,
-        "expires_at": expires_at.isoformat(),
-        "created_at": datetime.now(timezone.utc).isoformat()
+        "user_id": user_data["user_id"],
+        "expires_at": expires_at,
+        "created_at": datetime.now(timezone.utc)
     }
-    await db.user_sessions.insert_one(session_doc)
+    try:
+        await db.user_sessions.insert_one(session_doc)
+    except DuplicateKeyError:
+        # A double-submitted callback already stored this session
+        pass
+    
+    user = User(**user_data)
+    session_cache.set(session_token, user, expires_at)
     
     response.set_cookie(
         key="session_token",
@@ -231,11 +1236,7 @@ async def auth_callback(session_id: str, response: Response):
         max_age=7*24*60*60
     )
     
-    user_data = await db.users.find_one({"user_id": user_id}, {"_id": 0})
-    if isinstance(user_data.get("created_at"), str):
-        user_data["created_at"] = datetime.fromisoformat(user_data["created_at"])
-    
-    return User(**user_data)
+    return user
 
 @api_router.get("/auth/me", response_model=User)
 async def get_me(request: Request, authorization: Optional[str] = Header(None)):
@@ -245,41 +1246,278 @@ async def get_me(request: Request, authorization: Optional[str] = Header(None)):
 async def logout(request: Request, response: Response):
     session_token = request.cookies.get("session_token")
     if session_token:
+        session_cache.invalidate(session_token)
         await db.user_sessions.delete_one({"session_token": session_token})
     response.delete_cookie("session_token", path="/")
     return {"message": "Logged out successfully"}
 
+@api_router.get("/system/session-cache")
+async def get_session_cache_stats():
+    return session_cache.stats()
+
+@api_router.get("/system/auth-exchange")
+async def get_auth_exchange_stats():
+    return session_exchange_cache.stats()
+
+@api_router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@api_router.get("/system/query-profile")
+async def get_query_profile_stats():
+    return query_profiler.stats()
+
+# Realtime Routes
+def sse_frame(event: Dict[str, Any]) -> str:
+    payload = {"kind": event["kind"], "action": event["action"], "data": event["data"]}
+    return f"id: {event['id']}\nevent: change\ndata: {json.dumps(payload, default=json_default)}\n\n"
+
+@api_router.get("/events/stream")
+async def stream_events(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[str] = None
+):
+    user = await get_current_user(request, authorization)
+    
+    # Subscribe before replaying so nothing published in between is lost
+    queue = change_broker.subscribe(user.user_id)
+    resume_from = last_event_id or since
+    backlog = change_broker.replay(user.user_id, resume_from) if resume_from else []
+    
+    async def generate():
+        try:
+            yield f"retry: 3000\nevent: hello\ndata: {json.dumps({'instance_id': change_broker.instance_id})}\n\n"
+            last_seq = 0
+            if backlog is None:
+                yield "event: reset\ndata: {}\n\n"
+            else:
+                for event in backlog:
+                    last_seq = event["seq"]
+                    yield sse_frame(event)
+            
+            while True:
+                if queue.overflowed:
+                    # Fell too far behind; the client reconnects and resyncs
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=REALTIME_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    yield ": ping\n\n"
+                    continue
+                if event["seq"] <= last_seq:
+                    continue
+                yield sse_frame(event)
+        finally:
+            change_broker.unsubscribe(user.user_id, queue)
+    
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@api_router.get("/system/realtime")
+async def get_realtime_stats():
+    return change_broker.stats()
+
 # Task Routes
+# Task search
+# Whole words go through the text index on title, tags and description, which
+# ranks by relevance. The word being typed is matched as a prefix against
+# search_words, the folded title words kept on each task, whose multikey index
+# turns an anchored regex into an index range scan; tags are prefix-matched
+# directly.
+SEARCH_WORD_PATTERN = re.compile(r"\w+")
+
+def fold_text(text: str) -> str:
+    # Lowercase and strip accents, so "revisão" is found by typing "revisao"
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def search_words(title: Optional[str]) -> List[str]:
+    return list(dict.fromkeys(SEARCH_WORD_PATTERN.findall(fold_text(title or ""))))[:50]
+
+def task_search_query(user_id: str, q: Optional[str], tags: Optional[List[str]], prefix: bool) -> Dict[str, Any]:
+    words = SEARCH_WORD_PATTERN.findall(q or "")
+    partial = fold_text(words.pop()) if prefix and words else None
+
+    query: Dict[str, Any] = {"user_id": user_id}
+    if words:
+        query["$text"] = {"$search": " ".join(words)}
+    if partial:
+        pattern = f"^{re.escape(partial)}"
+        query["$or"] = [
+            {"search_words": {"$regex": pattern}},
+            {"tags": {"$regex": pattern, "$options": "i"}}
+        ]
+    if tags:
+        query["tags"] = {"$all": tags}
+    return query
+
+def new_task_doc(user_id: str, task_data: TaskCreate, now: datetime) -> Dict[str, Any]:
+    return {
+        "task_id": f"task_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        **task_data.model_dump(include=set(TaskCreate.model_fields)),
+        "search_words": search_words(task_data.title),
+        "status": TaskStatus.TODO.value,
+        "actual_time": 0,
+        "created_at": now,
+        "updated_at": now,
+        "completed_at": None
+    }
+
+# Task updates run as a single-stage update pipeline so the completed_at
+# transition is decided against the stored status atomically. Values are
+# wrapped in $literal so user text starting with "$" is never read as a path.
+def task_update_pipeline(task_update: TaskUpdate, now: datetime) -> List[Dict[str, Any]]:
+    fields = {k: {"$literal": v} for k, v in task_update.model_dump().items() if v is not None}
+    fields["updated_at"] = now
+    if task_update.title is not None:
+        fields["search_words"] = {"$literal": search_words(task_update.title)}
+    
+    if task_update.status == TaskStatus.DONE:
+        fields["completed_at"] = {"$cond": [{"$ne": ["$status", TaskStatus.DONE.value]}, now, "$completed_at"]}
+    
+    return [{"$set": fields}]
+
+def apply_task_update(task_doc: Dict[str, Any], task_update: TaskUpdate, now: datetime) -> Dict[str, Any]:
+    # Mirrors task_update_pipeline in Python, for callers that hold the
+    # document as it was right before the update
+    updated_doc = {**task_doc, **{k: v for k, v in task_update.model_dump().items() if v is not None}}
+    updated_doc["updated_at"] = now
+    if task_update.title is not None:
+        updated_doc["search_words"] = search_words(task_update.title)
+    
+    if task_update.status == TaskStatus.DONE and task_doc.get("status") != TaskStatus.DONE.value:
+        updated_doc["completed_at"] = now
+    
+    return updated_doc
+
 @api_router.get("/tasks", response_model=List[Task])
 async def get_tasks(
     request: Request,
+    response: Response,
     authorization: Optional[str] = Header(None),
-    status: Optional[str] = None,
-    category: Optional[str] = None,
-    sprint_id: Optional[str] = None
+    status: Optional[List[TaskStatus]] = Query(None),
+    category: Optional[List[TaskCategory]] = Query(None),
+    priority: Optional[List[TaskPriority]] = Query(None),
+    tag: Optional[List[str]] = Query(None),
+    sprint_id: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    updated_after: Optional[datetime] = None,
+    updated_before: Optional[datetime] = None,
+    completed_after: Optional[datetime] = None,
+    completed_before: Optional[datetime] = None,
+    sort: TaskSortField = TaskSortField.CREATED_AT,
+    order: SortOrder = SortOrder.DESC,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = None,
+    include_archived: bool = False
 ):
     user = await get_current_user(request, authorization)
+    selected = parse_fields(fields, Task, "task_id")
+    collections = [db.tasks, db.tasks_archive] if include_archived else [db.tasks]
+    
+    not_modified = await check_not_modified(request, response, user.user_id)
+    if not_modified:
+        return not_modified
     
     query = {"user_id": user.user_id}
-    if status:
-        query["status"] = status
-    if category:
-        query["category"] = category
+    for field, values in (("status", status), ("category", category), ("priority", priority), ("tags", tag)):
+        if values:
+            values = [getattr(value, "value", value) for value in values]
+            query[field] = values[0] if len(values) == 1 else {"$in": values}
     if sprint_id:
         query["sprint_id"] = sprint_id
+    for field, after, before in (
+        ("created_at", created_after, created_before),
+        ("updated_at", updated_after, updated_before),
+        ("completed_at", completed_after, completed_before)
+    ):
+        bounds = date_range_filter(after, before)
+        if bounds:
+            query[field] = bounds
+    
+    direction = DESCENDING if order == SortOrder.DESC else ASCENDING
+    if cursor:
+        query.update(cursor_filter(cursor, sort.value, "task_id", direction))
+    
+    sort_keys = [(sort.value, direction), ("task_id", direction)]
+    if stream:
+        tasks_cursors = [collection.find(query, fields_projection(selected)).sort(sort_keys) for collection in collections]
+        return ndjson_response(tasks_cursors, dict(response.headers))
+    
+    tasks_cursors = [collection.find(query, fields_projection(selected, sort.value)).sort(sort_keys) for collection in collections]
+    tasks = await fetch_page(tasks_cursors, response, limit, sort.value, "task_id", direction)
+    return list_response(Task, tasks, response, selected)
+
+@api_router.get("/tasks/search", response_model=List[TaskSearchResult])
+async def search_tasks(
+    request: Request,
+    response: Response,
+    authorization: Optional[str] = Header(None),
+    q: Optional[str] = Query(None, max_length=200),
+    tag: Optional[List[str]] = Query(None),
+    prefix: bool = True,
+    limit: int = Query(SEARCH_PAGE_SIZE_DEFAULT, ge=1, le=SEARCH_PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    include_archived: bool = False
+):
+    user = await get_current_user(request, authorization)
     
-    tasks_cursor = db.tasks.find(query, {"_id": 0}).sort("created_at", -1)
-    tasks = await tasks_cursor.to_list(length=1000)
+    query = task_search_query(user.user_id, q, tag, prefix)
+    if len(query) == 1:
+        raise HTTPException(status_code=400, detail="Provide q or tag")
     
-    for task in tasks:
-        if isinstance(task.get("created_at"), str):
-            task["created_at"] = datetime.fromisoformat(task["created_at"])
-        if isinstance(task.get("updated_at"), str):
-            task["updated_at"] = datetime.fromisoformat(task["updated_at"])
-        if task.get("completed_at") and isinstance(task["completed_at"], str):
-            task["completed_at"] = datetime.fromisoformat(task["completed_at"])
+    # Relevance order has no stable key to resume from, so the cursor is an
+    # offset; it is capped because deep offsets rescan every earlier match
+    offset = 0
+    if cursor:
+        try:
+            offset = int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["o"])
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset > SEARCH_MAX_OFFSET:
+        raise HTTPException(status_code=400, detail="Search cursor too deep; refine the query")
+    
+    projection = fields_projection(None)
+    if "$text" in query:
+        projection["score"] = {"$meta": "textScore"}
+        sort = [("score", {"$meta": "textScore"}), ("updated_at", DESCENDING), ("task_id", DESCENDING)]
+    else:
+        sort = [("updated_at", DESCENDING), ("task_id", DESCENDING)]
     
-    return [Task(**task) for task in tasks]
+    if include_archived:
+        # Each collection returns its best offset + limit + 1 matches, which
+        # is enough to cut the requested page from their merge
+        batches = await asyncio.gather(*(
+            collection.find(query, projection).sort(sort).to_list(length=offset + limit + 1)
+            for collection in (db.tasks, db.tasks_archive)
+        ))
+        tasks = sorted(
+            chain.from_iterable(batches),
+            key=lambda doc: (doc.get("score", 0), as_utc(doc["updated_at"]), doc["task_id"]),
+            reverse=True
+        )[offset:offset + limit + 1]
+    else:
+        tasks = await db.tasks.find(query, projection).sort(sort).skip(offset).limit(limit + 1).to_list(length=limit + 1)
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = base64.urlsafe_b64encode(json.dumps({"o": offset + limit}).encode()).decode()
+        response.headers["X-Next-Cursor"] = next_cursor
+    
+    return list_response(TaskSearchResult, tasks, response)
 
 @api_router.post("/tasks", response_model=Task)
 async def create_task(
@@ -289,45 +1527,143 @@ async def create_task(
 ):
     user = await get_current_user(request, authorization)
     
-    task_id = f"task_{uuid.uuid4().hex[:12]}"
-    now = datetime.now(timezone.utc)
-    
-    task_doc = {
-        "task_id": task_id,
-        "user_id": user.user_id,
-        **task_data.model_dump(),
-        "status": TaskStatus.TODO.value,
-        "actual_time": 0,
-        "created_at": now.isoformat(),
-        "updated_at": now.isoformat(),
-        "completed_at": None
-    }
+    task_doc = new_task_doc(user.user_id, task_data, datetime.now(timezone.utc))
     
     await db.tasks.insert_one(task_doc)
+    await record_user_write(
+        user.user_id,
+        task_stats_delta(None, task_doc),
+        [task_event(user.user_id, None, task_doc, task_doc["created_at"])],
+        [change("task", "created", task_doc)]
+    )
     
-    task_doc["created_at"] = now
-    task_doc["updated_at"] = now
     return Task(**task_doc)
 
+@api_router.post("/tasks/bulk", response_model=BulkTaskResponse)
+async def bulk_tasks(
+    bulk_request: BulkTaskRequest,
+    request: Request,
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(request, authorization)
+    now = datetime.now(timezone.utc)
+    
+    # Creates go out as one insert_many. Updates and deletes are grouped per
+    # task and each runs as its own atomic write returning the stored document
+    # it replaced, like the single-task routes: a bulk_write only reports
+    # aggregate counts, so it cannot tell which operation found its task gone
+    # or changed. Chains for different tasks run concurrently; operations on
+    # the same task run in request order.
+    results: List[BulkTaskResult] = []
+    created = []
+    chains: Dict[str, List[tuple]] = {}
+    for index, operation in enumerate(bulk_request.operations):
+        result = BulkTaskResult(index=index, op=operation.op, task_id=operation.task_id, status=200)
+        results.append(result)
+        
+        if operation.op == BulkOperationType.CREATE:
+            if operation.task is None:
+                result.status, result.error = 400, "create requires task"
+                continue
+            new_doc = new_task_doc(user.user_id, operation.task, now)
+            result.task_id, result.status = new_doc["task_id"], 201
+            created.append((result, new_doc))
+            continue
+        
+        if not operation.task_id:
+            result.status, result.error = 400, f"{operation.op.value} requires task_id"
+            continue
+        if operation.op == BulkOperationType.UPDATE and operation.changes is None:
+            result.status, result.error = 400, "update requires changes"
+            continue
+        chains.setdefault(operation.task_id, []).append((result, operation))
+    
+    applied: List[tuple] = []
+    if created:
+        try:
+            await db.tasks.insert_many([dict(doc) for _, doc in created], ordered=True)
+            inserted = len(created)
+        except BulkWriteError as e:
+            inserted = e.details.get("nInserted", 0)
+            write_error = e.details["writeErrors"][0]
+            created[inserted][0].status = 500
+            created[inserted][0].error = write_error.get("errmsg", "Write failed")
+            for result, _ in created[inserted + 1:]:
+                result.status, result.error = 409, "Not executed after an earlier failure"
+        applied.extend((result, None, doc) for result, doc in created[:inserted])
+    
+    async def run_chain(task_id: str, operations: List[tuple]) -> List[tuple]:
+        done = []
+        for position, (result, operation) in enumerate(operations):
+            try:
+                if operation.op == BulkOperationType.UPDATE:
+                    old_doc = await db.tasks.find_one_and_update(
+                        {"task_id": task_id, "user_id": user.user_id},
+                        task_update_pipeline(operation.changes, now),
+                        projection={"_id": 0},
+                        return_document=ReturnDocument.BEFORE
+                    )
+                    new_doc = apply_task_update(old_doc, operation.changes, now) if old_doc else None
+                else:
+                    old_doc = await db.tasks.find_one_and_delete({"task_id": task_id, "user_id": user.user_id}, {"_id": 0})
+                    new_doc = None
+            except OperationFailure as e:
+                result.status, result.error = 500, str(e)
+                for skipped, _ in operations[position + 1:]:
+                    skipped.status, skipped.error = 409, "Not executed after an earlier failure"
+                break
+            if old_doc is None:
+                result.status, result.error = 404, "Task not found"
+                continue
+            done.append((result, old_doc, new_doc))
+        return done
+    
+    for done in await asyncio.gather(*(run_chain(task_id, operations) for task_id, operations in chains.items())):
+        applied.extend(done)
+    applied.sort(key=lambda item: item[0].index)
+    
+    response = BulkTaskResponse(results=results)
+    stats_inc: Dict[str, int] = {}
+    events = []
+    changes = []
+    for result, old_doc, new_doc in applied:
+        for key, value in task_stats_delta(old_doc, new_doc).items():
+            stats_inc[key] = stats_inc.get(key, 0) + value
+        events.append(task_event(user.user_id, old_doc, new_doc, now))
+        if result.op == BulkOperationType.CREATE:
+            response.created += 1
+        elif result.op == BulkOperationType.UPDATE:
+            response.updated += 1
+        else:
+            response.deleted += 1
+        if new_doc is not None:
+            result.task = Task(**new_doc)
+            changes.append(change("task", "created" if old_doc is None else "updated", new_doc))
+        else:
+            changes.append(change("task", "deleted", {"task_id": result.task_id}))
+    
+    if applied:
+        await record_user_write(user.user_id, {key: value for key, value in stats_inc.items() if value}, events, changes)
+    
+    return response
+
 @api_router.get("/tasks/{task_id}", response_model=Task)
 async def get_task(
     task_id: str,
     request: Request,
+    response: Response,
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(request, authorization)
     
+    not_modified = await check_not_modified(request, response, user.user_id)
+    if not_modified:
+        return not_modified
+    
     task_doc = await db.tasks.find_one({"task_id": task_id, "user_id": user.user_id}, {"_id": 0})
     if not task_doc:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    if isinstance(task_doc.get("created_at"), str):
-        task_doc["created_at"] = datetime.fromisoformat(task_doc["created_at"])
-    if isinstance(task_doc.get("updated_at"), str):
-        task_doc["updated_at"] = datetime.fromisoformat(task_doc["updated_at"])
-    if task_doc.get("completed_at") and isinstance(task_doc["completed_at"], str):
-        task_doc["completed_at"] = datetime.fromisoformat(task_doc["completed_at"])
-    
     return Task(**task_doc)
 
 @api_router.put("/tasks/{task_id}", response_model=Task)
@@ -338,30 +1674,27 @@ async def update_task(
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(request, authorization)
+    now = datetime.now(timezone.utc)
     
-    task_doc = await db.tasks.find_one({"task_id": task_id, "user_id": user.user_id}, {"_id": 0})
+    # The pre-update document is needed for the user_stats delta; the updated
+    # one is derived from it with the same rules the pipeline applied.
+    task_doc = await db.tasks.find_one_and_update(
+        {"task_id": task_id, "user_id": user.user_id},
+        task_update_pipeline(task_update, now),
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
+    )
     if not task_doc:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    update_data = {k: v for k, v in task_update.model_dump().items() if v is not None}
-    update_data["updated_at"] = datetime.now(timezone.utc).isoformat()
-    
-    if task_update.status == TaskStatus.DONE and task_doc.get("status") != TaskStatus.DONE.value:
-        update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
-    
-    await db.tasks.update_one(
-        {"task_id": task_id},
-        {"$set": update_data}
+    updated_task = apply_task_update(task_doc, task_update, now)
+    await record_user_write(
+        user.user_id,
+        task_stats_delta(task_doc, updated_task),
+        [task_event(user.user_id, task_doc, updated_task, now)],
+        [change("task", "updated", updated_task)]
     )
     
-    updated_task = await db.tasks.find_one({"task_id": task_id}, {"_id": 0})
-    if isinstance(updated_task.get("created_at"), str):
-        updated_task["created_at"] = datetime.fromisoformat(updated_task["created_at"])
-    if isinstance(updated_task.get("updated_at"), str):
-        updated_task["updated_at"] = datetime.fromisoformat(updated_task["updated_at"])
-    if updated_task.get("completed_at") and isinstance(updated_task["completed_at"], str):
-        updated_task["completed_at"] = datetime.fromisoformat(updated_task["completed_at"])
-    
     return Task(**updated_task)
 
 @api_router.delete("/tasks/{task_id}")
@@ -372,32 +1705,51 @@ async def delete_task(
 ):
     user = await get_current_user(request, authorization)
     
-    result = await db.tasks.delete_one({"task_id": task_id, "user_id": user.user_id})
-    if result.deleted_count == 0:
+    deleted_task = await db.tasks.find_one_and_delete(
+        {"task_id": task_id, "user_id": user.user_id},
+        {"_id": 0}
+    )
+    if not deleted_task:
         raise HTTPException(status_code=404, detail="Task not found")
     
+    await record_user_write(
+        user.user_id,
+        task_stats_delta(deleted_task, None),
+        [task_event(user.user_id, deleted_task, None, datetime.now(timezone.utc))],
+        [change("task", "deleted", {"task_id": task_id})]
+    )
+    
     return {"message": "Task deleted successfully"}
 
 # Sprint Routes
 @api_router.get("/sprints", response_model=List[Sprint])
 async def get_sprints(
     request: Request,
-    authorization: Optional[str] = Header(None)
+    response: Response,
+    authorization: Optional[str] = Header(None),
+    fields: Optional[str] = None
 ):
     user = await get_current_user(request, authorization)
+    selected = parse_fields(fields, Sprint, "sprint_id")
     
-    sprints_cursor = db.sprints.find({"user_id": user.user_id}, {"_id": 0}).sort("created_at", -1)
-    sprints = await sprints_cursor.to_list(length=100)
+    not_modified = await check_not_modified(request, response, user.user_id)
+    if not_modified:
+        return not_modified
     
-    for sprint in sprints:
-        if isinstance(sprint.get("created_at"), str):
-            sprint["created_at"] = datetime.fromisoformat(sprint["created_at"])
-        if isinstance(sprint.get("start_date"), str):
-            sprint["start_date"] = datetime.fromisoformat(sprint["start_date"])
-        if isinstance(sprint.get("end_date"), str):
-            sprint["end_date"] = datetime.fromisoformat(sprint["end_date"])
-    
-    return [Sprint(**sprint) for sprint in sprints]
+    sprints_cursor = db.sprints.find({"user_id": user.user_id}, fields_projection(selected)).sort("created_at", -1)
+    sprints = await sprints_cursor.to_list(length=100)
+    return list_response(Sprint, sprints, response, selected)
+
+def new_sprint_doc(user_id: str, sprint_data: SprintCreate, now: datetime) -> Dict[str, Any]:
+    return {
+        "sprint_id": f"sprint_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        **sprint_data.model_dump(include=set(SprintCreate.model_fields)),
+        "status": SprintStatus.ACTIVE.value,
+        "start_date": as_utc(sprint_data.start_date),
+        "end_date": as_utc(sprint_data.end_date),
+        "created_at": now
+    }
 
 @api_router.post("/sprints", response_model=Sprint)
 async def create_sprint(
@@ -407,31 +1759,164 @@ async def create_sprint(
 ):
     user = await get_current_user(request, authorization)
     
-    sprint_id = f"sprint_{uuid.uuid4().hex[:12]}"
-    now = datetime.now(timezone.utc)
+    sprint_doc = new_sprint_doc(user.user_id, sprint_data, datetime.now(timezone.utc))
     
-    sprint_doc = {
-        "sprint_id": sprint_id,
-        "user_id": user.user_id,
-        **sprint_data.model_dump(),
-        "status": SprintStatus.ACTIVE.value,
-        "created_at": now.isoformat()
-    }
+    await db.sprints.insert_one(sprint_doc)
+    await record_user_write(user.user_id, {"active_sprints": 1}, changes=[change("sprint", "created", sprint_doc)])
     
-    if isinstance(sprint_doc["start_date"], datetime):
-        sprint_doc["start_date"] = sprint_doc["start_date"].isoformat()
-    if isinstance(sprint_doc["end_date"], datetime):
-        sprint_doc["end_date"] = sprint_doc["end_date"].isoformat()
+    return Sprint(**sprint_doc)
+
+def burndown_contribution(state: Optional[Dict[str, Any]], sprint_id: str) -> tuple:
+    if not state or state["sprint_id"] != sprint_id or state["status"] == TaskStatus.DONE.value:
+        return 0, 0
+    return state["estimated_time"] or 0, 1
+
+def apply_burndown_event(burndown: Dict[str, Any], event: Dict[str, Any], sprint_id: str, sprint_start: datetime, sprint_end: datetime):
+    # Remaining work is additive over events, so running totals plus the
+    # end-of-day value for each day with activity are all the state we keep
+    before_minutes, before_tasks = burndown_contribution(event["before"], sprint_id)
+    after_minutes, after_tasks = burndown_contribution(event["after"], sprint_id)
+    delta_minutes, delta_tasks = after_minutes - before_minutes, after_tasks - before_tasks
+    burndown["remaining_minutes"] += delta_minutes
+    burndown["remaining_tasks"] += delta_tasks
     
-    await db.sprints.insert_one(sprint_doc)
+    # An event can arrive after later ones were applied, so it shifts the
+    # end-of-day value of its own day and of every later day already recorded
+    at = as_utc(event["at"])
+    day_key = stats_day_key(max(at, sprint_start))
+    daily = burndown["daily"]
+    if day_key not in daily:
+        earlier = [key for key in daily if key < day_key]
+        daily[day_key] = dict(daily[max(earlier)]) if earlier else {"minutes": 0, "tasks": 0}
+    for key in daily:
+        if key >= day_key:
+            daily[key] = {"minutes": daily[key]["minutes"] + delta_minutes, "tasks": daily[key]["tasks"] + delta_tasks}
     
-    sprint_doc["created_at"] = now
-    sprint_doc["start_date"] = sprint_data.start_date
-    sprint_doc["end_date"] = sprint_data.end_date
+    after, before = event["after"], event["before"]
+    completed = (
+        after and after["sprint_id"] == sprint_id and after["status"] == TaskStatus.DONE.value
+        and (not before or before["status"] != TaskStatus.DONE.value)
+    )
+    if completed and sprint_start <= at < sprint_end:
+        burndown["completed_tasks"] += 1
+        burndown["completed_minutes"] += after["estimated_time"] or 0
+
+@api_router.get("/sprints/{sprint_id}/burndown")
+async def get_sprint_burndown(
+    sprint_id: str,
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    refresh: bool = False
+):
+    user = await get_current_user(request, authorization)
     
-    return Sprint(**sprint_doc)
+    sprint_doc, burndown = await asyncio.gather(
+        db.sprints.find_one({"sprint_id": sprint_id, "user_id": user.user_id}, {"_id": 0}),
+        db.sprint_burndowns.find_one({"sprint_id": sprint_id, "user_id": user.user_id}, {"_id": 0})
+    )
+    if not sprint_doc:
+        raise HTTPException(status_code=404, detail="Sprint not found")
+    
+    now = datetime.now(timezone.utc)
+    sprint_start = rollup_bucket_start(sprint_doc["start_date"], RollupPeriod.DAY)
+    sprint_end = rollup_bucket_start(sprint_doc["end_date"], RollupPeriod.DAY) + timedelta(days=1)
+    
+    # Burndowns cached before the replay window existed are rebuilt once
+    if refresh or not burndown or "window_event_ids" not in burndown:
+        burndown = {
+            "sprint_id": sprint_id,
+            "user_id": user.user_id,
+            "remaining_minutes": 0,
+            "remaining_tasks": 0,
+            "completed_minutes": 0,
+            "completed_tasks": 0,
+            "daily": {},
+            "last_event_at": None,
+            "window_event_ids": [],
+            "final": False
+        }
+    
+    # A sprint that had already ended when its burndown was last computed can
+    # no longer change, so its cached result is served as-is
+    if not burndown["final"]:
+        # An event's `at` is taken when its write starts but it is inserted
+        # after the write, so events can land behind the newest one already
+        # applied. Replay re-scans TASK_EVENT_MAX_LAG behind the watermark and
+        # skips the events in that window it has already applied.
+        events_query = {"user_id": user.user_id, "sprints": sprint_id}
+        if burndown["last_event_at"]:
+            events_query["at"] = {"$gte": burndown["last_event_at"] - TASK_EVENT_MAX_LAG}
+        window = {event_id: at for event_id, at in burndown["window_event_ids"]}
+        
+        async for event in db.task_events.find(events_query).sort([("at", 1), ("_id", 1)]):
+            if event["_id"] in window:
+                continue
+            apply_burndown_event(burndown, event, sprint_id, sprint_start, sprint_end)
+            window[event["_id"]] = event["at"]
+            if not burndown["last_event_at"] or event["at"] > burndown["last_event_at"]:
+                burndown["last_event_at"] = event["at"]
+        
+        if burndown["last_event_at"]:
+            horizon = burndown["last_event_at"] - TASK_EVENT_MAX_LAG
+            burndown["window_event_ids"] = [[event_id, at] for event_id, at in window.items() if at >= horizon]
+        # Only frozen once no event for the sprint can still be in flight
+        burndown["final"] = now >= sprint_end + TASK_EVENT_MAX_LAG
+        await db.sprint_burndowns.replace_one(
+            {"sprint_id": sprint_id, "user_id": user.user_id},
+            dict(burndown, computed_at=now),
+            upsert=True
+        )
+    
+    # Carry each day's remaining work forward across days without activity
+    series = []
+    current = {"minutes": 0, "tasks": 0}
+    days = (sprint_end - sprint_start).days
+    initial = None
+    for offset in range(days):
+        day = sprint_start + timedelta(days=offset)
+        if day > now:
+            break
+        current = burndown["daily"].get(stats_day_key(day), current)
+        if initial is None:
+            initial = current
+        ideal = initial["minutes"] * (1 - (offset + 1) / days) if days else 0
+        series.append({
+            "date": stats_day_key(day),
+            "remaining_minutes": current["minutes"],
+            "remaining_tasks": current["tasks"],
+            "ideal_minutes": round(ideal, 2)
+        })
+    
+    elapsed_days = max(1, min(days, (min(now, sprint_end) - sprint_start).days or 1))
+    return {
+        "sprint_id": sprint_id,
+        "start_date": sprint_start,
+        "end_date": sprint_end,
+        "remaining_minutes": burndown["remaining_minutes"],
+        "remaining_tasks": burndown["remaining_tasks"],
+        "velocity": {
+            "completed_tasks": burndown["completed_tasks"],
+            "completed_minutes": burndown["completed_minutes"],
+            "minutes_per_day": round(burndown["completed_minutes"] / elapsed_days, 2)
+        },
+        "final": burndown["final"],
+        "series": series
+    }
 
 # Time Entry Routes
+def new_time_entry_doc(user_id: str, entry_data: TimeEntryCreate, end_time: datetime, now: datetime) -> Dict[str, Any]:
+    end_time = as_utc(end_time)
+    return {
+        "entry_id": f"entry_{uuid.uuid4().hex[:12]}",
+        "user_id": user_id,
+        "task_id": entry_data.task_id,
+        "start_time": end_time - timedelta(minutes=entry_data.duration),
+        "end_time": end_time,
+        "duration": entry_data.duration,
+        "entry_type": entry_data.entry_type.value,
+        "created_at": now
+    }
+
 @api_router.post("/time-entries", response_model=TimeEntry)
 async def create_time_entry(
     entry_data: TimeEntryCreate,
@@ -439,47 +1924,172 @@ async def create_time_entry(
     authorization: Optional[str] = Header(None)
 ):
     user = await get_current_user(request, authorization)
+    now = datetime.now(timezone.utc)
     
-    task_doc = await db.tasks.find_one({"task_id": entry_data.task_id, "user_id": user.user_id}, {"_id": 0})
+    # Checking the task exists and crediting its actual_time is one atomic write
+    task_doc = await db.tasks.find_one_and_update(
+        {"task_id": entry_data.task_id, "user_id": user.user_id},
+        {"$inc": {"actual_time": entry_data.duration}},
+        projection={"_id": 0, "task_id": 1, "category": 1, "sprint_id": 1}
+    )
     if not task_doc:
         raise HTTPException(status_code=404, detail="Task not found")
     
-    entry_id = f"entry_{uuid.uuid4().hex[:12]}"
-    end_time = datetime.now(timezone.utc)
-    start_time = end_time - timedelta(minutes=entry_data.duration)
-    
-    entry_doc = {
-        "entry_id": entry_id,
-        "user_id": user.user_id,
-        "task_id": entry_data.task_id,
-        "start_time": start_time.isoformat(),
-        "end_time": end_time.isoformat(),
-        "duration": entry_data.duration,
-        "entry_type": entry_data.entry_type.value,
-        "created_at": datetime.now(timezone.utc).isoformat()
-    }
+    entry_doc = new_time_entry_doc(user.user_id, entry_data, now, now)
     
     await db.time_entries.insert_one(entry_doc)
+    await asyncio.gather(
+        record_user_write(
+            user.user_id,
+            {f"minutes_by_day.{stats_day_key(entry_doc['start_time'])}": entry_data.duration},
+            changes=[change("time_entry", "created", entry_doc)]
+        ),
+        apply_time_rollups(user.user_id, time_rollup_increments(entry_doc, task_doc))
+    )
+    
+    return TimeEntry(**entry_doc)
+
+@api_router.post("/time-entries/batch", response_model=TimeEntryBatchResponse)
+async def create_time_entries_batch(
+    batch: TimeEntryBatchRequest,
+    request: Request,
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(request, authorization)
     
-    # Update task actual_time
-    await db.tasks.update_one(
-        {"task_id": entry_data.task_id},
-        {"$inc": {"actual_time": entry_data.duration}}
+    # A concurrent retry of the same batch can win the race on the unique
+    # idempotency index; the whole transaction then aborts and the second
+    # attempt reports those entries as duplicates.
+    for attempt in range(2):
+        try:
+            return await ingest_time_entries(user.user_id, batch.entries)
+        except (DuplicateKeyError, BulkWriteError):
+            if attempt:
+                raise HTTPException(status_code=409, detail="Conflicting concurrent time entry batch")
+
+async def ingest_time_entries(user_id: str, entries: List[TimeEntryBatchItem]) -> TimeEntryBatchResponse:
+    now = datetime.now(timezone.utc)
+    keys = list({entry.idempotency_key for entry in entries})
+    task_ids = list({entry.task_id for entry in entries})
+    
+    existing_entries, owned_tasks = await asyncio.gather(
+        db.time_entries.find(
+            {"user_id": user_id, "idempotency_key": {"$in": keys}},
+            {"_id": 0, "idempotency_key": 1, "entry_id": 1, "task_id": 1, "credited": 1}
+        ).to_list(length=None),
+        db.tasks.find(
+            {"user_id": user_id, "task_id": {"$in": task_ids}},
+            {"_id": 0, "task_id": 1, "category": 1, "sprint_id": 1}
+        ).to_list(length=None)
     )
+    seen_keys = {doc["idempotency_key"]: doc["entry_id"] for doc in existing_entries}
+    owned_tasks = {task_doc["task_id"]: task_doc for task_doc in owned_tasks}
+    # Entries stored by an attempt that failed before crediting them; this
+    # attempt finishes the job instead of reporting them as plain duplicates
+    to_credit: Dict[str, List[str]] = {}
+    for doc in existing_entries:
+        if doc.get("credited") is False:
+            to_credit.setdefault(doc["task_id"], []).append(doc["entry_id"])
     
-    entry_doc["start_time"] = start_time
-    entry_doc["end_time"] = end_time
-    entry_doc["created_at"] = datetime.now(timezone.utc)
+    response = TimeEntryBatchResponse(results=[])
+    entry_docs = []
+    for index, entry in enumerate(entries):
+        result = TimeEntryBatchResult(index=index, idempotency_key=entry.idempotency_key, status=201)
+        response.results.append(result)
+        
+        if entry.idempotency_key in seen_keys:
+            result.status, result.entry_id = 200, seen_keys[entry.idempotency_key]
+            response.duplicates += 1
+            continue
+        if entry.task_id not in owned_tasks:
+            result.status, result.error = 404, "Task not found"
+            continue
+        
+        entry_doc = new_time_entry_doc(user_id, entry, entry.end_time or now, now)
+        entry_doc["idempotency_key"] = entry.idempotency_key
+        entry_doc["credited"] = False
+        entry_docs.append(entry_doc)
+        seen_keys[entry.idempotency_key] = result.entry_id = entry_doc["entry_id"]
+        to_credit.setdefault(entry.task_id, []).append(entry_doc["entry_id"])
     
-    return TimeEntry(**entry_doc)
+    if not to_credit:
+        return response
+    
+    # Entries are stored uncredited, then claimed and credited one task at a
+    # time: a per-task token marks the entries, and one $inc adds their minutes
+    # to the task. Only claimed entries add to actual_time, stats and rollups.
+    # Without a transaction, a failed $inc releases just that task's claim, and
+    # tasks credited before it keep theirs, so the retry credits exactly the
+    # entries that were not.
+    async def record_credited(credited: List[Dict[str, Any]]):
+        stats_inc: Dict[str, int] = {}
+        rollup_increments = []
+        for doc in credited:
+            day_key = f"minutes_by_day.{stats_day_key(doc['start_time'])}"
+            stats_inc[day_key] = stats_inc.get(day_key, 0) + doc["duration"]
+            rollup_increments.extend(time_rollup_increments(doc, owned_tasks.get(doc["task_id"], {"category": "deleted"})))
+        await asyncio.gather(
+            record_user_write(user_id, stats_inc, changes=[change("time_entry", "created", doc) for doc in credited]),
+            apply_time_rollups(user_id, rollup_increments)
+        )
+    
+    async def write(session):
+        if entry_docs:
+            await db.time_entries.insert_many([dict(doc) for doc in entry_docs], session=session)
+        credited = []
+        try:
+            for task_id, entry_ids in to_credit.items():
+                claim = uuid.uuid4().hex
+                await db.time_entries.update_many(
+                    {"entry_id": {"$in": entry_ids}, "credited": False},
+                    {"$set": {"credited": claim}},
+                    session=session
+                )
+                claimed = await db.time_entries.find(
+                    {"entry_id": {"$in": entry_ids}, "credited": claim}, {"_id": 0}, session=session
+                ).to_list(length=None)
+                if not claimed:
+                    continue
+                try:
+                    await db.tasks.update_one(
+                        {"task_id": task_id, "user_id": user_id},
+                        {"$inc": {"actual_time": sum(doc["duration"] for doc in claimed)}},
+                        session=session
+                    )
+                except Exception:
+                    # A transaction rolls the claim back itself
+                    if session is None:
+                        await db.time_entries.update_many({"entry_id": {"$in": entry_ids}, "credited": claim}, {"$set": {"credited": False}})
+                    raise
+                credited.extend(claimed)
+        except Exception:
+            # Without a transaction the tasks credited so far stay credited and
+            # the retry skips them, so their minutes are recorded now
+            if session is None and credited:
+                await record_credited(credited)
+            raise
+        return credited
+    
+    await record_credited(await run_in_transaction(write))
+    
+    response.created = len(entry_docs)
+    return response
 
 @api_router.get("/time-entries")
 async def get_time_entries(
     request: Request,
+    response: Response,
     authorization: Optional[str] = Header(None),
-    date: Optional[str] = None
+    date: Optional[str] = None,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: Optional[str] = None,
+    stream: bool = False,
+    fields: Optional[str] = None,
+    include_archived: bool = False
 ):
     user = await get_current_user(request, authorization)
+    selected = parse_fields(fields, TimeEntry, "entry_id")
+    collections = [db.time_entries, db.time_entries_archive] if include_archived else [db.time_entries]
     
     query = {"user_id": user.user_id}
     
@@ -487,69 +2097,386 @@ async def get_time_entries(
         date_obj = datetime.fromisoformat(date).replace(tzinfo=timezone.utc)
         start_of_day = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
         end_of_day = start_of_day + timedelta(days=1)
-        query["start_time"] = {"$gte": start_of_day.isoformat(), "$lt": end_of_day.isoformat()}
+        query["start_time"] = {"$gte": start_of_day, "$lt": end_of_day}
+    if cursor:
+        query.update(cursor_filter(cursor, "created_at", "entry_id"))
     
-    entries_cursor = db.time_entries.find(query, {"_id": 0}).sort("created_at", -1)
-    entries = await entries_cursor.to_list(length=1000)
+    sort_keys = [("created_at", -1), ("entry_id", -1)]
+    if stream:
+        return ndjson_response([collection.find(query, fields_projection(selected)).sort(sort_keys) for collection in collections])
     
-    return entries
+    entries_cursors = [collection.find(query, fields_projection(selected, "created_at")).sort(sort_keys) for collection in collections]
+    entries = await fetch_page(entries_cursors, response, limit, "created_at", "entry_id")
+    return list_response(TimeEntry, entries, response, selected)
 
-# Dashboard Routes
-@api_router.get("/dashboard/overview")
-async def get_dashboard_overview(
+# Report Routes
+@api_router.get("/reports/time")
+async def get_time_report(
     request: Request,
-    authorization: Optional[str] = Header(None)
+    authorization: Optional[str] = Header(None),
+    period: RollupPeriod = RollupPeriod.DAY,
+    group_by: ReportGroupBy = ReportGroupBy.CATEGORY,
+    days: int = Query(90, ge=1, le=3660),
+    end: Optional[datetime] = None
 ):
     user = await get_current_user(request, authorization)
     
-    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
-    tomorrow = today + timedelta(days=1)
+    last_bucket = rollup_bucket_start(end or datetime.now(timezone.utc), period)
+    first_bucket = rollup_bucket_start(last_bucket - timedelta(days=days - 1), period)
     
-    # Tasks today (due today or in progress)
-    tasks_today = await db.tasks.count_documents({
-        "user_id": user.user_id,
-        "status": {"$ne": TaskStatus.DONE.value}
-    })
+    projection = {"_id": 0, "bucket_start": 1, "minutes": 1}
+    if group_by in ROLLUP_GROUP_FIELDS:
+        projection[ROLLUP_GROUP_FIELDS[group_by]] = 1
     
-    # Tasks completed today
-    tasks_completed_today = await db.tasks.count_documents({
+    rollups_cursor = db.time_rollups.find({
         "user_id": user.user_id,
-        "status": TaskStatus.DONE.value,
-        "completed_at": {"$gte": today.isoformat(), "$lt": tomorrow.isoformat()}
-    })
+        "period": period.value,
+        "bucket_start": {"$gte": first_bucket, "$lte": last_bucket}
+    }, projection).sort("bucket_start", 1)
+    rollups = {as_utc(doc["bucket_start"]): doc async for doc in rollups_cursor}
     
-    # Time entries today
-    entries_today_cursor = db.time_entries.find({
-        "user_id": user.user_id,
-        "start_time": {"$gte": today.isoformat(), "$lt": tomorrow.isoformat()}
-    }, {"_id": 0})
-    entries_today = await entries_today_cursor.to_list(length=1000)
-    total_time_today = sum(entry["duration"] for entry in entries_today)
+    step = timedelta(days=7 if period == RollupPeriod.WEEK else 1)
+    buckets = []
+    totals: Dict[str, int] = {}
+    bucket_start = first_bucket
+    while bucket_start <= last_bucket:
+        rollup = rollups.get(bucket_start, {})
+        bucket = {"start": bucket_start, "minutes": rollup.get("minutes", 0)}
+        if group_by in ROLLUP_GROUP_FIELDS:
+            bucket["groups"] = rollup.get(ROLLUP_GROUP_FIELDS[group_by], {})
+            for key, minutes in bucket["groups"].items():
+                totals[key] = totals.get(key, 0) + minutes
+        buckets.append(bucket)
+        bucket_start += step
     
-    # Active sprints
-    active_sprints = await db.sprints.count_documents({
-        "user_id": user.user_id,
-        "status": SprintStatus.ACTIVE.value
-    })
+    return {
+        "period": period.value,
+        "group_by": group_by.value,
+        "start": first_bucket,
+        "end": last_bucket + step,
+        "total_minutes": sum(bucket["minutes"] for bucket in buckets),
+        "totals": totals,
+        "buckets": buckets
+    }
+
+# Export and Import Routes
+# Exports stream straight from Motor cursors through an incremental gzip
+# compressor, so memory stays flat whatever the dataset size. Collections are
+# written sprints first, then tasks, then time entries, which is the order an
+# import needs to resolve the references between them. Archived tasks and time
+# entries are included and come back into the live collections on import.
+EXPORT_MODELS = {
+    DataCollection.SPRINTS: Sprint,
+    DataCollection.TASKS: Task,
+    DataCollection.TIME_ENTRIES: TimeEntry
+}
+# Each collection is read in the order of its (user_id, created_at, ...) list
+# index, so the cursor walks the index instead of sorting the user's documents
+EXPORT_SORTS = {
+    DataCollection.SPRINTS: [("created_at", DESCENDING)],
+    DataCollection.TASKS: [("created_at", DESCENDING), ("task_id", DESCENDING)],
+    DataCollection.TIME_ENTRIES: [("created_at", DESCENDING), ("entry_id", DESCENDING)]
+}
+# CSV cells holding lists are written and read back as JSON
+CSV_LIST_FIELDS = {"tags"}
+
+def export_columns(collection: DataCollection) -> List[str]:
+    return [name for name in EXPORT_MODELS[collection].model_fields if name != "user_id"]
+
+def csv_cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return str(value.value)
+    if isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return str(value)
+
+def csv_line(values: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+@api_router.get("/export")
+async def export_data(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    format: ExportFormat = ExportFormat.NDJSON,
+    collection: Optional[List[DataCollection]] = Query(None)
+):
+    user = await get_current_user(request, authorization)
     
-    # Tasks by category
-    tasks_by_category = {}
-    for category in TaskCategory:
-        count = await db.tasks.count_documents({
-            "user_id": user.user_id,
-            "category": category.value,
-            "status": {"$ne": TaskStatus.DONE.value}
-        })
-        tasks_by_category[category.value] = count
+    collections = [c for c in DataCollection if not collection or c in collection]
+    if format == ExportFormat.CSV and len(collections) != 1:
+        raise HTTPException(status_code=400, detail="CSV exports one collection at a time")
+    
+    async def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        for data_collection in collections:
+            columns = export_columns(data_collection)
+            if format == ExportFormat.CSV:
+                yield compressor.compress(csv_line(columns).encode())
+            
+            sources = [data_collection.value, ARCHIVE_COLLECTIONS.get(data_collection.value)]
+            cursors = [db[source].find({"user_id": user.user_id}, fields_projection(None)).sort(EXPORT_SORTS[data_collection]) for source in sources if source]
+            chunk = []
+            async for doc in chain_cursors(cursors):
+                doc.pop("user_id", None)
+                if format == ExportFormat.CSV:
+                    chunk.append(csv_line([csv_cell(doc.get(name)) for name in columns]).encode())
+                else:
+                    chunk.append(json_dumps({"collection": data_collection.value, "data": doc}) + b"\n")
+                if len(chunk) >= STREAM_BATCH_SIZE:
+                    yield compressor.compress(b"".join(chunk))
+                    chunk = []
+            if chunk:
+                yield compressor.compress(b"".join(chunk))
+        yield compressor.flush()
+    
+    extension = "ndjson" if format == ExportFormat.NDJSON else f"{collections[0].value}.csv"
+    return StreamingResponse(
+        generate(),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="devflow-export.{extension}.gz"'}
+    )
+
+async def read_import_lines(request: Request):
+    # Yields decoded lines from a plain or gzip-compressed upload as it arrives
+    decompressor = None
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    pending = ""
+    first = True
+    async for chunk in request.stream():
+        if first and chunk:
+            first = False
+            if chunk[:2] == b"\x1f\x8b":
+                decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        data = decompressor.decompress(chunk) if decompressor else chunk
+        pending += decoder.decode(data)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line
+    pending += decoder.decode(decompressor.flush() if decompressor else b"", final=True)
+    if pending:
+        yield pending
+
+async def read_import_rows(request: Request, format: ExportFormat, collection: Optional[DataCollection]):
+    """Yields (line number, collection, row dict or error message)."""
+    if format == ExportFormat.NDJSON:
+        line_number = 0
+        async for line in read_import_lines(request):
+            line_number += 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                row_collection, data = DataCollection(record["collection"]), record["data"]
+            except (ValueError, KeyError, TypeError) as e:
+                yield line_number, None, f"Invalid record: {e}"
+                continue
+            if not isinstance(data, dict):
+                yield line_number, row_collection, "Invalid record: data must be an object"
+                continue
+            yield line_number, row_collection, data
+        return
+    
+    # A quoted CSV cell may span lines; a record is complete once its quotes balance
+    header = None
+    record, record_line, line_number = "", 0, 0
+    async for line in read_import_lines(request):
+        line_number += 1
+        if not record:
+            record_line = line_number
+        record += line + "\n"
+        if record.count('"') % 2:
+            continue
+        values, record = next(csv.reader([record]), []), ""
+        if not values:
+            continue
+        if header is None:
+            header = values
+            continue
+        row = {name: value for name, value in zip(header, values) if value != ""}
+        for name in CSV_LIST_FIELDS & row.keys():
+            try:
+                row[name] = json.loads(row[name])
+            except ValueError:
+                row[name] = [row[name]]
+        yield record_line, collection, row
+    if record:
+        yield record_line, collection, "Unterminated quoted field"
+
+def validation_message(error: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, item['loc'])) or 'row'}: {item['msg']}" for item in error.errors())
+
+class DataImporter:
+    """Validates and inserts imported rows in insert_many batches.
+
+    Every document gets a new id; ids from the file are remapped so tasks keep
+    their sprint and time entries their task. A reference to something that
+    is neither in the file nor already owned by the user is a row error.
+    """
+    
+    def __init__(self, user_id: str):
+        self.user_id = user_id
+        self.now = datetime.now(timezone.utc)
+        self.id_map: Dict[str, str] = {}
+        self.imported = {c.value: 0 for c in DataCollection}
+        self.errors: List[ImportRowError] = []
+        self.error_count = 0
+    
+    def error(self, line: int, collection: Optional[DataCollection], message: str):
+        self.error_count += 1
+        if len(self.errors) < IMPORT_MAX_ERRORS:
+            self.errors.append(ImportRowError(line=line, collection=collection.value if collection else None, error=message))
+    
+    async def owned_ids(self, collection: str, id_field: str, ids: set) -> set:
+        unknown = [i for i in ids if i not in self.id_map]
+        if not unknown:
+            return set()
+        cursor = db[collection].find({"user_id": self.user_id, id_field: {"$in": unknown}}, {"_id": 0, id_field: 1})
+        return {doc[id_field] async for doc in cursor}
+    
+    async def flush(self, collection: DataCollection, rows: List[tuple]):
+        docs, lines = [], []
+        if collection == DataCollection.TASKS:
+            owned = await self.owned_ids("sprints", "sprint_id", {row.get("sprint_id") for _, row in rows if row.get("sprint_id")})
+        elif collection == DataCollection.TIME_ENTRIES:
+            owned = await self.owned_ids("tasks", "task_id", {row.get("task_id") for _, row in rows if row.get("task_id")})
+        
+        for line, row in rows:
+            try:
+                doc = self.build(collection, row, owned if collection != DataCollection.SPRINTS else set())
+            except ValidationError as e:
+                self.error(line, collection, validation_message(e))
+                continue
+            except (ValueError, TypeError) as e:
+                self.error(line, collection, str(e))
+                continue
+            docs.append(doc)
+            lines.append(line)
+        
+        if not docs:
+            return
+        try:
+            result = await db[collection.value].insert_many(docs, ordered=False)
+            self.imported[collection.value] += len(result.inserted_ids)
+        except BulkWriteError as e:
+            for write_error in e.details.get("writeErrors", []):
+                self.error(lines[write_error["index"]], collection, write_error.get("errmsg", "Write failed"))
+            self.imported[collection.value] += e.details.get("nInserted", 0)
+    
+    def build(self, collection: DataCollection, row: Dict[str, Any], owned: set) -> Dict[str, Any]:
+        if collection == DataCollection.SPRINTS:
+            item = SprintImport(**row)
+            doc = new_sprint_doc(self.user_id, item, self.now)
+            doc["status"] = item.status.value
+            doc["created_at"] = as_utc(item.created_at) if item.created_at else self.now
+            old_id = row.get("sprint_id")
+            new_id = doc["sprint_id"]
+        elif collection == DataCollection.TASKS:
+            item = TaskImport(**row)
+            if item.sprint_id:
+                item.sprint_id = self.resolve(item.sprint_id, owned, "sprint_id")
+            doc = new_task_doc(self.user_id, item, as_utc(item.created_at) if item.created_at else self.now)
+            doc["status"] = item.status.value
+            doc["actual_time"] = item.actual_time
+            if item.updated_at:
+                doc["updated_at"] = as_utc(item.updated_at)
+            if item.status == TaskStatus.DONE:
+                doc["completed_at"] = as_utc(item.completed_at or doc["updated_at"])
+            old_id = row.get("task_id")
+            new_id = doc["task_id"]
+        else:
+            item = TimeEntryImport(**row)
+            item.task_id = self.resolve(item.task_id, owned, "task_id")
+            doc = new_time_entry_doc(self.user_id, item, item.end_time or self.now, as_utc(item.created_at) if item.created_at else self.now)
+            old_id = new_id = None
+        
+        if old_id:
+            self.id_map[old_id] = new_id
+        return doc
+    
+    def resolve(self, reference: str, owned: set, field: str) -> str:
+        if reference in self.id_map:
+            return self.id_map[reference]
+        if reference in owned:
+            return reference
+        raise ValueError(f"Unknown {field}: {reference}")
+
+@api_router.post("/import", response_model=ImportResponse)
+async def import_data(
+    request: Request,
+    authorization: Optional[str] = Header(None),
+    format: ExportFormat = ExportFormat.NDJSON,
+    collection: Optional[DataCollection] = None
+):
+    user = await get_current_user(request, authorization)
+    if format == ExportFormat.CSV and collection is None:
+        raise HTTPException(status_code=400, detail="CSV imports need ?collection=")
+    
+    importer = DataImporter(user.user_id)
+    batch: List[tuple] = []
+    batch_collection = None
+    async for line, row_collection, row in read_import_rows(request, format, collection):
+        if isinstance(row, str):
+            importer.error(line, row_collection, row)
+            continue
+        # Flush on a collection change so references to earlier rows resolve
+        if batch and (row_collection != batch_collection or len(batch) >= IMPORT_BATCH_SIZE):
+            await importer.flush(batch_collection, batch)
+            batch = []
+        batch_collection = row_collection
+        batch.append((line, row))
+    if batch:
+        await importer.flush(batch_collection, batch)
+    
+    # Imported documents bypass the per-write counters; rebuild them once
+    if any(importer.imported.values()):
+        await rebuild_user_stats(user.user_id)
+        await rebuild_time_rollups(user.user_id)
+        await record_user_write(user.user_id, changes=[("task", "imported", dict(importer.imported))])
+    
+    return ImportResponse(imported=importer.imported, error_count=importer.error_count, errors=importer.errors)
+
+# Dashboard Routes
+@api_router.get("/dashboard/overview")
+async def get_dashboard_overview(
+    request: Request,
+    response: Response,
+    authorization: Optional[str] = Header(None)
+):
+    user = await get_current_user(request, authorization)
+    
+    # Today's counters roll over at midnight without any write, so the day
+    # is part of the ETag
+    today_key = stats_day_key(datetime.now(timezone.utc))
+    not_modified = await check_not_modified(request, response, user.user_id, today_key)
+    if not_modified:
+        return not_modified
+    
+    stats = await db.user_stats.find_one({"user_id": user.user_id}, {"_id": 0})
+    if not stats:
+        stats = await rebuild_user_stats(user.user_id)
+    
+    tasks_by_category = {category.value: 0 for category in TaskCategory}
+    for category, count in stats.get("open_by_category", {}).items():
+        if category in tasks_by_category:
+            tasks_by_category[category] = count
     
     return {
-        "tasks_today": tasks_today,
-        "tasks_completed_today": tasks_completed_today,
-        "total_time_today": total_time_today,
-        "active_sprints": active_sprints,
+        "tasks_today": stats.get("open_tasks", 0),
+        "tasks_completed_today": stats.get("completed_by_day", {}).get(today_key, 0),
+        "total_time_today": stats.get("minutes_by_day", {}).get(today_key, 0),
+        "active_sprints": stats.get("active_sprints", 0),
         "tasks_by_category": tasks_by_category
     }
 
+# Chat and match routes live in chat.py
+api_router.include_router(create_chat_router(db, get_current_user, publish_changes))
+
 app.include_router(api_router)
 
 app.add_middleware(
@@ -558,14 +2485,228 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
+# Flagged requests are explained against the app database; see metrics.py
+query_profiler.explain = lambda command: db.command(command)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
+# Indexes
+# Every query shape issued by the routes above must be served by one of these.
+# user_sessions.expires_at is a TTL index, so it only applies to sessions whose
+# expires_at is stored as a BSON date.
+INDEXES: Dict[str, List[IndexModel]] = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True),
+        # Partial so it can be built next to the plain email index it replaces;
+        # every user has an email, so it still covers the whole collection
+        IndexModel(
+            [("email", ASCENDING)],
+            name="user_email_unique",
+            unique=True,
+            partialFilterExpression={"email": {"$exists": True}}
+        )
+    ],
+    "user_sessions": [
+        IndexModel([("session_token", ASCENDING)], name="session_token_unique", unique=True),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0)
+    ],
+    "user_stats": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True)
+    ],
+    "task_events": [
+        IndexModel([("user_id", ASCENDING), ("sprints", ASCENDING), ("at", ASCENDING)], name="user_sprints_at")
+    ],
+    "sprint_burndowns": [
+        IndexModel([("sprint_id", ASCENDING)], name="sprint_id_unique", unique=True)
+    ],
+    "time_rollups": [
+        IndexModel([("user_id", ASCENDING), ("period", ASCENDING), ("bucket_start", ASCENDING)], name="user_period_bucket_unique", unique=True)
+    ],
+    "user_versions": [
+        IndexModel([("user_id", ASCENDING)], name="user_id_unique", unique=True)
+    ],
+    "tasks": [
+        IndexModel([("task_id", ASCENDING)], name="task_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_created_task"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_status_created_task"),
+        IndexModel([("user_id", ASCENDING), ("category", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_category_created_task"),
+        IndexModel([("user_id", ASCENDING), ("sprint_id", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_sprint_created_task"),
+        IndexModel([("user_id", ASCENDING), ("priority", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_priority_created_task"),
+        IndexModel([("user_id", ASCENDING), ("tags", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_tags_created_task"),
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("task_id", DESCENDING)], name="user_updated_task"),
+        IndexModel([("user_id", ASCENDING), ("completed_at", DESCENDING)], name="user_completed"),
+        IndexModel([("completed_at", ASCENDING)], name="done_completed", partialFilterExpression={"status": TaskStatus.DONE.value}),
+        IndexModel([("user_id", ASCENDING), ("search_words", ASCENDING)], name="user_search_words"),
+        IndexModel(
+            [("user_id", ASCENDING), ("title", TEXT), ("tags", TEXT), ("description", TEXT)],
+            name="user_text",
+            weights={"title": 10, "tags": 5, "description": 1},
+            default_language="none"
+        )
+    ],
+    "sprints": [
+        IndexModel([("sprint_id", ASCENDING)], name="sprint_id_unique", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING)], name="user_status")
+    ],
+    "time_entries": [
+        IndexModel([("entry_id", ASCENDING)], name="entry_id_unique", unique=True),
+        IndexModel(
+            [("user_id", ASCENDING), ("idempotency_key", ASCENDING)],
+            name="user_idempotency_key_unique",
+            unique=True,
+            partialFilterExpression={"idempotency_key": {"$type": "string"}}
+        ),
+        IndexModel([("user_id", ASCENDING), ("start_time", ASCENDING)], name="user_start_time"),
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("entry_id", DESCENDING)], name="user_created_entry"),
+        IndexModel([("user_id", ASCENDING), ("task_id", ASCENDING)], name="user_task")
+    ],
+    # Archives only serve include_archived reads, so they carry the user-scoped
+    # sort and search indexes and none of the per-filter ones
+    "tasks_archive": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("task_id", DESCENDING)], name="user_created_task"),
+        IndexModel([("user_id", ASCENDING), ("updated_at", DESCENDING), ("task_id", DESCENDING)], name="user_updated_task"),
+        IndexModel([("user_id", ASCENDING), ("search_words", ASCENDING)], name="user_search_words"),
+        IndexModel(
+            [("user_id", ASCENDING), ("title", TEXT), ("tags", TEXT), ("description", TEXT)],
+            name="user_text",
+            weights={"title": 10, "tags": 5, "description": 1},
+            default_language="none"
+        )
+    ],
+    "time_entries_archive": [
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("entry_id", DESCENDING)], name="user_created_entry")
+    ]
+}
+
+# Representative filter/sort pairs for the queries the routes issue; explained
+# at startup so a query that has lost its index shows up in the logs.
+QUERY_SHAPES: List[Dict[str, Any]] = [
+    {"route": "get_current_user", "collection": "user_sessions", "filter": {"session_token": ""}},
+    {"route": "get_current_user", "collection": "users", "filter": {"user_id": ""}},
+    {"route": "auth_callback", "collection": "users", "filter": {"email": ""}},
+    {"route": "get_tasks", "collection": "tasks", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?status", "collection": "tasks", "filter": {"user_id": "", "status": TaskStatus.TODO.value}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?category", "collection": "tasks", "filter": {"user_id": "", "category": TaskCategory.TASK.value}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?sprint_id", "collection": "tasks", "filter": {"user_id": "", "sprint_id": ""}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?status=a&status=b", "collection": "tasks", "filter": {"user_id": "", "status": {"$in": [TaskStatus.TODO.value, TaskStatus.IN_PROGRESS.value]}}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?priority", "collection": "tasks", "filter": {"user_id": "", "priority": TaskPriority.HIGH.value}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?tag", "collection": "tasks", "filter": {"user_id": "", "tags": {"$in": [""]}}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?sort=updated_at", "collection": "tasks", "filter": {"user_id": ""}, "sort": [("updated_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_tasks?completed_after", "collection": "tasks", "filter": {"user_id": "", "completed_at": {"$gte": datetime.min}}},
+    {"route": "get_task", "collection": "tasks", "filter": {"task_id": "", "user_id": ""}},
+    {"route": "search_tasks?q", "collection": "tasks", "filter": {"user_id": "", "$text": {"$search": "word"}}},
+    {"route": "search_tasks?q=prefix", "collection": "tasks", "filter": {"user_id": "", "search_words": {"$regex": "^pre"}}, "sort": [("updated_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "get_sprints", "collection": "sprints", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING)]},
+    {"route": "rebuild_user_stats", "collection": "sprints", "filter": {"user_id": "", "status": SprintStatus.ACTIVE.value}},
+    {"route": "get_time_entries", "collection": "time_entries", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING), ("entry_id", DESCENDING)]},
+    {"route": "get_time_entries?date", "collection": "time_entries", "filter": {"user_id": "", "start_time": {"$gte": datetime.min, "$lt": datetime.max}}},
+    {"route": "get_dashboard_overview", "collection": "user_stats", "filter": {"user_id": ""}},
+    {"route": "get_time_report", "collection": "time_rollups", "filter": {"user_id": "", "period": RollupPeriod.DAY.value, "bucket_start": {"$gte": datetime.min, "$lte": datetime.max}}, "sort": [("bucket_start", ASCENDING)]},
+    {"route": "get_sprint_burndown", "collection": "task_events", "filter": {"user_id": "", "sprints": "", "at": {"$gte": datetime.min}}, "sort": [("at", ASCENDING), ("_id", ASCENDING)]},
+    {"route": "get_sprint_burndown", "collection": "sprint_burndowns", "filter": {"sprint_id": "", "user_id": ""}},
+    {"route": "check_not_modified", "collection": "user_versions", "filter": {"user_id": ""}},
+    {"route": "archive_task_batch", "collection": "tasks", "filter": {"status": TaskStatus.DONE.value, "completed_at": {"$lt": datetime.max}}, "sort": [("completed_at", ASCENDING)]},
+    {"route": "archive_task_batch", "collection": "time_entries", "filter": {"user_id": {"$in": [""]}, "task_id": {"$in": [""]}}},
+    {"route": "get_tasks?include_archived", "collection": "tasks_archive", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING), ("task_id", DESCENDING)]},
+    {"route": "search_tasks?include_archived", "collection": "tasks_archive", "filter": {"user_id": "", "search_words": {"$regex": "^pre"}}},
+    {"route": "get_time_entries?include_archived", "collection": "time_entries_archive", "filter": {"user_id": ""}, "sort": [("created_at", DESCENDING), ("entry_id", DESCENDING)]}
+]
+
+for collection_name, indexes in CHAT_INDEXES.items():
+    INDEXES.setdefault(collection_name, []).extend(indexes)
+QUERY_SHAPES.extend(CHAT_QUERY_SHAPES)
+
+def plan_has_collscan(plan: Any) -> bool:
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(plan_has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(plan_has_collscan(value) for value in plan)
+    return False
+
+# Superseded indexes, mapped to the index that replaces them. One is only
+# dropped once its replacement has been built: a unique build fails on existing
+# duplicates (see `manage.py dedupe-users`), and queries keep the old index
+# until then.
+OBSOLETE_INDEXES: Dict[str, Dict[str, str]] = {
+    "users": {"email": "user_email_unique", "email_unique": "user_email_unique"}
+}
+
+async def ensure_indexes():
+    for collection_name, indexes in INDEXES.items():
+        try:
+            await db[collection_name].create_indexes(indexes)
+        except OperationFailure as e:
+            logger.error(f"Failed to create indexes on {collection_name}: {e}")
+    for collection_name, replacements in OBSOLETE_INDEXES.items():
+        existing = await db[collection_name].index_information()
+        for index_name, replacement in replacements.items():
+            if index_name not in existing:
+                continue
+            if replacement not in existing:
+                logger.warning(f"Keeping {collection_name}.{index_name} until {replacement} can be built")
+                continue
+            try:
+                await db[collection_name].drop_index(index_name)
+            except OperationFailure as e:
+                # IndexNotFound: another worker starting up dropped it first
+                if e.code != 27:
+                    raise
+
+async def find_collscan_queries() -> List[str]:
+    collscans = []
+    for shape in QUERY_SHAPES:
+        cursor = db[shape["collection"]].find(shape["filter"])
+        if shape.get("sort"):
+            cursor = cursor.sort(shape["sort"])
+        try:
+            explanation = await cursor.explain()
+        except OperationFailure as e:
+            logger.warning(f"Could not explain {shape['route']} query: {e}")
+            continue
+        if plan_has_collscan(explanation.get("queryPlanner", {}).get("winningPlan")):
+            collscans.append(f"{shape['route']} ({shape['collection']} {shape['filter']})")
+    return collscans
+
+@app.on_event("startup")
+async def bootstrap_indexes():
+    await ensure_indexes()
+    if os.environ.get('INDEX_REPORT', 'true').lower() != 'true':
+        return
+    collscans = await find_collscan_queries()
+    for query in collscans:
+        logger.warning(f"Query would run as COLLSCAN: {query}")
+    logger.info(f"Index report: {len(QUERY_SHAPES) - len(collscans)}/{len(QUERY_SHAPES)} route queries use an index")
+
+@app.on_event("startup")
+async def start_change_stream_watcher():
+    global pre_images_enabled
+    if REALTIME_SOURCE == "change_stream":
+        pre_images_enabled = await enable_change_stream_pre_images()
+        app.state.change_stream_watcher = asyncio.create_task(watch_change_streams())
+
+@app.on_event("startup")
+async def start_archiver():
+    if ARCHIVE_AFTER_DAYS > 0:
+        app.state.archiver = asyncio.create_task(run_archiver())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    for name in ("change_stream_watcher", "archiver"):
+        background_task = getattr(app.state, name, None)
+        if background_task:
+            background_task.cancel()
+    if http_client is not None:
+        await http_client.aclose()
     client.close()
\ No newline at end of file
@@ -0,0 +1,24 @@
+import { useEffect, useRef } from 'react';
+import { API } from '../App';
+
+// Subscribes to the backend change stream. `onChange` receives
+// { kind, action, data } for every change, and { kind: 'reset' } when the
+// server could not replay what was missed and the page should refetch.
+// EventSource reconnects on its own and resumes from the last event id.
+export function useRealtime(onChange) {
+  const handlerRef = useRef(onChange);
+  handlerRef.current = onChange;
+
+  useEffect(() => {
+    const source = new EventSource(`${API}/events/stream`, { withCredentials: true });
+
+    source.addEventListener('change', (event) => {
+      handlerRef.current(JSON.parse(event.data));
+    });
+    source.addEventListener('reset', () => {
+      handlerRef.current({ kind: 'reset' });
+    });
+
+    return () => source.close();
+  }, []);
+}
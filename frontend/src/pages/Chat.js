@@ -7,6 +7,16 @@ import { Input } from '../components/ui/input';
 import { Avatar, AvatarImage, AvatarFallback } from '../components/ui/avatar';
 import { ArrowLeft, Send, Gamepad2 } from 'lucide-react';
 import { toast } from 'sonner';
+import { useRealtime } from '../hooks/use-realtime';
+
+const GAP_RETRY_MS = 3000;
+
+// Appends messages the page does not have yet, keeping them in seq order
+const mergeMessages = (current, incoming) => {
+  const lastSeq = current.length ? current[current.length - 1].seq : 0;
+  const fresh = incoming.filter((message) => message.seq > lastSeq);
+  return fresh.length ? [...current, ...fresh] : current;
+};
 
 const Chat = () => {
   const { matchId } = useParams();
@@ -19,21 +29,52 @@ const Chat = () => {
   const [currentUserId, setCurrentUserId] = useState(null);
   const [otherUser, setOtherUser] = useState(null);
   const messagesEndRef = useRef(null);
+  const lastSeqRef = useRef(0);
+  // Highest seq announced so far; the server only returns gap-free runs, so
+  // anything past lastSeqRef is fetched again once the gap is filled
+  const highestSeqRef = useRef(0);
+  const gapRetryRef = useRef(null);
 
   useEffect(() => {
     loadChat();
-    const interval = setInterval(loadChat, 3000); // Poll every 3 seconds
-    return () => clearInterval(interval);
+    return () => {
+      clearTimeout(gapRetryRef.current);
+      gapRetryRef.current = null;
+    };
   }, [matchId]);
 
   useEffect(() => {
     scrollToBottom();
   }, [messages]);
 
+  // New messages arrive over the event stream; only a gap in the sequence
+  // (or a stream reset) needs a fetch, and that fetch asks for the delta only
+  useRealtime((event) => {
+    if (event.kind === 'reset') {
+      loadNewMessages();
+    } else if (event.kind === 'message' && event.data.chat_id === matchId) {
+      highestSeqRef.current = Math.max(highestSeqRef.current, event.data.seq);
+      if (event.data.seq === lastSeqRef.current + 1) {
+        appendMessages([event.data]);
+      } else if (event.data.seq > lastSeqRef.current) {
+        loadNewMessages();
+      }
+    }
+  });
+
   const scrollToBottom = () => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  const appendMessages = (incoming) => {
+    if (incoming.length === 0) return;
+    lastSeqRef.current = Math.max(lastSeqRef.current, incoming[incoming.length - 1].seq);
+    setMessages((current) => mergeMessages(current, incoming));
+    if (highestSeqRef.current > lastSeqRef.current) {
+      loadNewMessages();
+    }
+  };
+
   const loadChat = async () => {
     try {
       const [chatRes, meRes] = await Promise.all([
@@ -43,12 +84,8 @@ const Chat = () => {
       
       setChat(chatRes.data);
       setMessages(chatRes.data.messages || []);
+      lastSeqRef.current = chatRes.data.last_seq || 0;
       setCurrentUserId(meRes.data.user_id);
-
-      // Get match details to find other user
-      const matchRes = await axiosInstance.get('/matches?limit=100');
-      // This is a workaround - in production you'd want a dedicated endpoint
-      // For now we just set a placeholder
       setOtherUser({ name: 'Parceiro' });
     } catch (error) {
       console.error('Error loading chat:', error);
@@ -61,6 +98,24 @@ const Chat = () => {
     }
   };
 
+  const loadNewMessages = async () => {
+    try {
+      const response = await axiosInstance.get(`/chats/${matchId}?since=${lastSeqRef.current}`);
+      const incoming = response.data.messages || [];
+      appendMessages(incoming);
+      // A seq whose send never completed is skipped by the server after a few
+      // seconds; without newer events nothing else would ask again
+      if (incoming.length === 0 && highestSeqRef.current > lastSeqRef.current && !gapRetryRef.current) {
+        gapRetryRef.current = setTimeout(() => {
+          gapRetryRef.current = null;
+          loadNewMessages();
+        }, GAP_RETRY_MS);
+      }
+    } catch (error) {
+      console.error('Error loading messages:', error);
+    }
+  };
+
   const handleSendMessage = async (e) => {
     e.preventDefault();
     if (!newMessage.trim() || sending) return;
@@ -70,12 +125,15 @@ const Chat = () => {
     setNewMessage('');
 
     try {
-      await axiosInstance.post(`/chats/${matchId}/message`, {
+      const response = await axiosInstance.post(`/chats/${matchId}/message`, {
         text: messageText
       });
-      
-      // Reload chat to get the new message
-      await loadChat();
+
+      if (response.data.seq === lastSeqRef.current + 1) {
+        appendMessages([response.data]);
+      } else {
+        await loadNewMessages();
+      }
     } catch (error) {
       console.error('Error sending message:', error);
       toast.error('Erro ao enviar mensagem');
@@ -24,7 +24,7 @@ const Dashboard = () => {
       const [userRes, overviewRes, tasksRes] = await Promise.all([
         axiosInstance.get('/auth/me'),
         axiosInstance.get('/dashboard/overview'),
-        axiosInstance.get('/tasks?status=todo&status=in_progress')
+        axiosInstance.get('/tasks?status=todo&status=in_progress&limit=5')
       ]);
       setUser(userRes.data);
       setOverview(overviewRes.data);
@@ -1,5 +1,6 @@
 import { useState, useEffect } from 'react';
 import { axiosInstance } from '../App';
+import { useRealtime } from '../hooks/use-realtime';
 import { Button } from '../components/ui/button';
 import { Card } from '../components/ui/card';
 import { Input } from '../components/ui/input';
@@ -28,9 +29,15 @@ const Tasks = () => {
     loadTasks();
   }, []);
 
+  useRealtime((change) => {
+    if (change.kind === 'task' || change.kind === 'reset') {
+      loadTasks();
+    }
+  });
+
   const loadTasks = async () => {
     try {
-      const response = await axiosInstance.get('/tasks');
+      const response = await axiosInstance.get('/tasks?fields=title,description,category,priority,status,actual_time');
       setTasks(response.data);
     } catch (error) {
       console.error('Error loading tasks:', error);
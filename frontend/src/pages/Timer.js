@@ -35,7 +35,7 @@ const Timer = () => {
 
   const loadTasks = async () => {
     try {
-      const response = await axiosInstance.get('/tasks?status=todo&status=in_progress');
+      const response = await axiosInstance.get('/tasks?status=todo&status=in_progress&fields=title');
       setTasks(response.data);
       if (response.data.length > 0 && !selectedTask) {
         setSelectedTask(response.data[0].task_id);
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+# server.py reads its settings at import time; the client it builds connects
+# lazily, so these unit tests never need a running MongoDB
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "devflow_test")
+os.environ.setdefault("INDEX_REPORT", "false")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """A TestClient on an in-memory database with one signed-in user.
+
+    Uses the same mongomock-motor stand-in as benchmarks/load.py; it has no
+    transactions, so routes take their single-write fallback.
+    """
+    from fastapi.testclient import TestClient
+    from mongomock_motor import AsyncMongoMockClient
+
+    import server
+
+    client = AsyncMongoMockClient(tz_aware=True)
+    monkeypatch.setattr(server, "client", client)
+    monkeypatch.setattr(server, "db", client[os.environ["DB_NAME"]])
+    monkeypatch.setattr(server, "transactions_supported", False)
+    server.session_cache.clear()
+
+    now = datetime.now(timezone.utc)
+
+    async def seed():
+        await server.db.users.insert_one({"user_id": "user_1", "email": "user_1@example.com", "name": "Test", "created_at": now})
+        await server.db.user_sessions.insert_one({
+            "user_id": "user_1", "session_token": "tok1", "expires_at": now + timedelta(days=1), "created_at": now
+        })
+    asyncio.run(seed())
+
+    test_client = TestClient(server.app)
+    test_client.headers["Authorization"] = "Bearer tok1"
+    return test_client
@@ -0,0 +1,60 @@
+import asyncio
+
+import server
+
+
+def bulk(api, *operations):
+    response = api.post("/api/tasks/bulk", json={"operations": list(operations)})
+    assert response.status_code == 200
+    return response.json()
+
+
+def stored_stats():
+    return asyncio.run(server.db.user_stats.find_one({"user_id": "user_1"}, {"_id": 0, "updated_at": 0}))
+
+
+def rebuilt_stats():
+    stats = asyncio.run(server.rebuild_user_stats("user_1"))
+    stats.pop("updated_at")
+    return stats
+
+
+def test_operations_run_in_order_per_task(api):
+    task_id = api.post("/api/tasks", json={"title": "A"}).json()["task_id"]
+
+    result = bulk(
+        api,
+        {"op": "create", "task": {"title": "New"}},
+        {"op": "update", "task_id": task_id, "changes": {"status": "done"}},
+        {"op": "delete", "task_id": task_id},
+        {"op": "update", "task_id": task_id, "changes": {"title": "Gone"}}
+    )
+
+    assert [item["status"] for item in result["results"]] == [201, 200, 200, 404]
+    assert (result["created"], result["updated"], result["deleted"]) == (1, 1, 1)
+    assert [task["title"] for task in api.get("/api/tasks").json()] == ["New"]
+
+
+def test_missing_tasks_are_reported_and_leave_stats_alone(api):
+    task_id = api.post("/api/tasks", json={"title": "A"}).json()["task_id"]
+    rebuilt_stats()
+
+    result = bulk(
+        api,
+        {"op": "delete", "task_id": "task_missing"},
+        {"op": "update", "task_id": "task_missing", "changes": {"status": "done"}},
+        {"op": "update", "task_id": task_id, "changes": {"status": "done"}}
+    )
+
+    assert [item["status"] for item in result["results"]] == [404, 404, 200]
+    assert (result["updated"], result["deleted"]) == (1, 0)
+    assert stored_stats() == rebuilt_stats()
+
+
+def test_update_without_changes_is_rejected(api):
+    task_id = api.post("/api/tasks", json={"title": "A"}).json()["task_id"]
+
+    result = bulk(api, {"op": "update", "task_id": task_id})
+
+    assert result["results"][0]["status"] == 400
+    assert result["updated"] == 0
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import server
+from server import ChangeBroker
+
+
+def publish(broker, user_id, count):
+    for index in range(count):
+        broker.publish(user_id, "task", "updated", {"task_id": f"task_{index}"})
+
+
+def test_replay_returns_missed_events():
+    broker = ChangeBroker(queue_size=10, buffer_size=10, max_users=10)
+    publish(broker, "user_1", 5)
+
+    events = broker.replay("user_1", f"{broker.instance_id}-2")
+    assert [event["seq"] for event in events] == [3, 4, 5]
+
+
+def test_replay_when_up_to_date_is_empty():
+    broker = ChangeBroker(queue_size=10, buffer_size=10, max_users=10)
+    publish(broker, "user_1", 3)
+
+    assert broker.replay("user_1", f"{broker.instance_id}-3") == []
+
+
+def test_replay_beyond_buffer_needs_reset():
+    broker = ChangeBroker(queue_size=10, buffer_size=3, max_users=10)
+    publish(broker, "user_1", 6)
+
+    # Events 2 and 3 have been pushed out of the buffer
+    assert broker.replay("user_1", f"{broker.instance_id}-1") is None
+    assert [event["seq"] for event in broker.replay("user_1", f"{broker.instance_id}-3")] == [4, 5, 6]
+
+
+def test_replay_from_another_instance_needs_reset():
+    broker = ChangeBroker(queue_size=10, buffer_size=10, max_users=10)
+    publish(broker, "user_1", 3)
+
+    assert broker.replay("user_1", "otherinstance-2") is None
+    assert broker.replay("user_1", f"{broker.instance_id}-x") is None
+
+
+def test_slow_subscriber_is_marked_overflowed():
+    broker = ChangeBroker(queue_size=2, buffer_size=10, max_users=10)
+    queue = broker.subscribe("user_1")
+    publish(broker, "user_1", 3)
+
+    assert queue.overflowed
+    assert queue.qsize() == 2
+    assert broker.overflows == 1
+
+
+@pytest.mark.parametrize("pre_images", [False, True])
+def test_watcher_only_asks_for_pre_images_once_enabled(monkeypatch, pre_images):
+    calls = []
+
+    class FakeDatabase:
+        def watch(self, pipeline, **options):
+            calls.append(options)
+            raise asyncio.CancelledError
+
+    monkeypatch.setattr(server, "db", FakeDatabase())
+    monkeypatch.setattr(server, "pre_images_enabled", pre_images)
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(server.watch_change_streams())
+    assert ("full_document_before_change" in calls[0]) is pre_images
@@ -0,0 +1,83 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from mongomock_motor import AsyncMongoMockClient
+
+import chat
+from chat import ConversationBuffer, contiguous_messages, create_chat_router
+from server import User
+
+NOW = datetime(2026, 5, 4, 12, 0, tzinfo=timezone.utc)
+
+
+def messages(*seqs, age=0):
+    return [{"seq": seq, "timestamp": NOW - timedelta(seconds=age)} for seq in seqs]
+
+
+def test_contiguous_messages_stop_at_the_first_gap():
+    assert contiguous_messages(messages(5, 6, 8), 4, NOW) == messages(5, 6)
+
+
+def test_contiguous_messages_need_the_next_seq():
+    assert contiguous_messages(messages(6, 7), 4, NOW) == []
+
+
+def test_contiguous_messages_skip_an_abandoned_gap():
+    stale = messages(5, 7, age=chat.CHAT_SEQ_GAP_SECONDS + 1)
+
+    assert contiguous_messages(stale + messages(8, 10), 4, NOW) == stale + messages(8)
+
+
+def test_buffer_restarts_after_a_gap():
+    buffer = ConversationBuffer(["user_1", "user_2"], last_seq=0, max_size=10)
+    for message in messages(1, 2, 4):
+        buffer.add(message)
+
+    assert [message["seq"] for message in buffer.messages] == [4]
+    assert not buffer.covers(1)
+    assert buffer.covers(3)
+
+
+@pytest.fixture
+def chat_api():
+    db = AsyncMongoMockClient(tz_aware=True)["devflow_test"]
+
+    async def get_current_user(request, authorization):
+        return User(user_id=authorization, email=f"{authorization}@example.com", name="Test", created_at=NOW)
+
+    app = FastAPI()
+    app.include_router(create_chat_router(db, get_current_user, lambda user_id, changes: None))
+    asyncio.run(db.matches.insert_one({
+        "match_id": "match_1",
+        "participants": ["user_1", "user_2"],
+        "likes": ["user_1", "user_2"],
+        "status": "matched",
+        "chat_id": "match_1",
+        "message_count": 0
+    }))
+    return TestClient(app, headers={"Authorization": "user_1"}), db
+
+
+def test_lost_send_stops_reads_until_its_seq_is_abandoned(chat_api):
+    client, db = chat_api
+    client.post("/chats/match_1/message", json={"text": "first"})
+    # A send that allocated seq 2 and died before inserting its message
+    asyncio.run(db.matches.update_one({"match_id": "match_1"}, {"$inc": {"message_count": 1}}))
+    for text in ("third", "fourth", "fifth"):
+        client.post("/chats/match_1/message", json={"text": text})
+
+    chat.conversation_cache._buffers.clear()
+    assert [m["seq"] for m in client.get("/chats/match_1").json()["messages"]] == [1]
+    assert client.get("/chats/match_1?since=1").json()["messages"] == []
+
+    stale = NOW - timedelta(seconds=chat.CHAT_SEQ_GAP_SECONDS + 1)
+    asyncio.run(db.messages.update_many({}, {"$set": {"timestamp": stale}}))
+    chat.conversation_cache._buffers.clear()
+
+    assert [m["seq"] for m in client.get("/chats/match_1").json()["messages"]] == [1, 3, 4, 5]
+    page = client.get("/chats/match_1?since=1").json()
+    assert [m["seq"] for m in page["messages"]] == [3, 4, 5]
+    assert page["last_seq"] == 5
@@ -0,0 +1,46 @@
+import asyncio
+
+import manage
+import server
+
+
+def test_unchanged_list_is_not_modified(api):
+    api.post("/api/tasks", json={"title": "A"})
+    first = api.get("/api/tasks")
+
+    repeat = api.get("/api/tasks", headers={"If-None-Match": first.headers["ETag"]})
+
+    assert repeat.status_code == 304
+    assert repeat.headers["ETag"] == first.headers["ETag"]
+
+
+def test_write_changes_the_etag(api):
+    etag = api.get("/api/tasks").headers["ETag"]
+    api.post("/api/tasks", json={"title": "A"})
+
+    response = api.get("/api/tasks", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
+def test_etag_is_scoped_to_path_and_query(api):
+    task_id = api.post("/api/tasks", json={"title": "A"}).json()["task_id"]
+    etag = api.get("/api/tasks").headers["ETag"]
+
+    assert api.get("/api/tasks?limit=1", headers={"If-None-Match": etag}).status_code == 200
+    assert api.get(f"/api/tasks/{task_id}", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_wildcard_does_not_hide_a_missing_task(api):
+    assert api.get("/api/tasks", headers={"If-None-Match": "*"}).status_code == 200
+    assert api.get("/api/tasks/task_missing", headers={"If-None-Match": "*"}).status_code == 404
+
+
+def test_rebuild_stats_invalidates_the_dashboard_etag(api, monkeypatch):
+    monkeypatch.setattr(manage, "db", server.db)
+    etag = api.get("/api/dashboard/overview").headers["ETag"]
+
+    asyncio.run(manage.rebuild_stats("user_1"))
+
+    assert api.get("/api/dashboard/overview", headers={"If-None-Match": etag}).status_code == 200
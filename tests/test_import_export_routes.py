@@ -0,0 +1,64 @@
+import gzip
+import json
+
+import pytest
+
+
+def ndjson(*records):
+    return "".join(json.dumps(record) + "\n" for record in records).encode()
+
+
+def test_export_then_import_round_trips(api):
+    sprint = api.post("/api/sprints", json={
+        "name": "S1", "start_date": "2026-01-01T00:00:00Z", "end_date": "2026-01-14T00:00:00Z"
+    }).json()
+    task = api.post("/api/tasks", json={"title": "Planned", "sprint_id": sprint["sprint_id"]}).json()
+    api.post("/api/time-entries", json={"task_id": task["task_id"], "start_time": "2026-01-02T10:00:00Z", "duration": 30})
+
+    exported = api.get("/api/export")
+    assert exported.status_code == 200
+    records = [json.loads(line) for line in gzip.decompress(exported.content).decode().splitlines()]
+    assert [record["collection"] for record in records] == ["sprints", "tasks", "time_entries"]
+
+    response = api.post("/api/import", content=exported.content)
+    assert response.status_code == 200
+    assert response.json()["imported"] == {"sprints": 1, "tasks": 1, "time_entries": 1}
+
+    tasks = api.get("/api/tasks").json()
+    imported = next(t for t in tasks if t["task_id"] != task["task_id"])
+    assert imported["sprint_id"] not in (None, sprint["sprint_id"])
+
+
+@pytest.mark.parametrize("data", [[1, 2], 5, "oops", None])
+def test_import_rejects_non_object_data(api, data):
+    body = ndjson(
+        {"collection": "tasks", "data": data},
+        {"collection": "sprints", "data": data},
+        {"collection": "tasks", "data": {"title": "Still imported"}}
+    )
+
+    response = api.post("/api/import", content=body)
+
+    assert response.status_code == 200
+    result = response.json()
+    assert result["imported"]["tasks"] == 1
+    assert result["error_count"] == 2
+    assert {error["error"] for error in result["errors"]} == {"Invalid record: data must be an object"}
+
+
+def test_import_reports_invalid_rows_and_unknown_references(api):
+    body = ndjson(
+        {"collection": "tasks", "data": {"title": "Bad", "priority": "urgent"}},
+        {"collection": "time_entries", "data": {"task_id": "task_missing", "duration": 5}}
+    ) + b"not json\n"
+
+    result = api.post("/api/import", content=body).json()
+
+    assert sum(result["imported"].values()) == 0
+    errors = {error["line"]: error["error"] for error in result["errors"]}
+    assert sorted(errors) == [1, 2, 3]
+    assert errors[2] == "Unknown task_id: task_missing"
+
+
+def test_csv_import_needs_a_collection(api):
+    assert api.post("/api/import?format=csv", content=b"title\nA\n").status_code == 400
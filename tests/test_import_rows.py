@@ -0,0 +1,58 @@
+import asyncio
+import gzip
+
+from server import DataCollection, ExportFormat, read_import_rows
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int = 7):
+        self.body = body
+        self.chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self.body), self.chunk_size):
+            yield self.body[start:start + self.chunk_size]
+
+
+def read_rows(body: bytes, format=ExportFormat.CSV, collection=DataCollection.TASKS):
+    async def collect():
+        return [row async for row in read_import_rows(FakeRequest(body), format, collection)]
+    return asyncio.run(collect())
+
+
+def test_csv_quoted_newlines_stay_in_one_record():
+    body = 'title,description,tags\n"Multi\nline, ""quoted""","second\nline","[""a"", ""b""]"\nPlain,,[]\n'
+
+    rows = read_rows(body.encode())
+
+    assert rows == [
+        (2, DataCollection.TASKS, {"title": 'Multi\nline, "quoted"', "description": "second\nline", "tags": ["a", "b"]}),
+        (5, DataCollection.TASKS, {"title": "Plain", "tags": []})
+    ]
+
+
+def test_csv_unterminated_quote_is_a_row_error():
+    rows = read_rows(b'title\n"never closed\n')
+
+    assert rows == [(2, DataCollection.TASKS, "Unterminated quoted field")]
+
+
+def test_csv_non_json_tags_become_a_single_tag():
+    rows = read_rows(b"title,tags\nTask,backend\n")
+
+    assert rows == [(2, DataCollection.TASKS, {"title": "Task", "tags": ["backend"]})]
+
+
+def test_gzip_ndjson_is_detected_and_split_per_line():
+    body = gzip.compress((
+        '{"collection": "sprints", "data": {"name": "S1"}}\n'
+        "\n"
+        "not json\n"
+        '{"collection": "tasks", "data": {"title": "Ação"}}'
+    ).encode())
+
+    rows = read_rows(body, format=ExportFormat.NDJSON, collection=None)
+
+    assert rows[0] == (1, DataCollection.SPRINTS, {"name": "S1"})
+    assert rows[1][0] == 3 and rows[1][1] is None and rows[1][2].startswith("Invalid record")
+    assert rows[2] == (4, DataCollection.TASKS, {"title": "Ação"})
@@ -0,0 +1,65 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+@pytest.fixture
+def legacy_tasks(api):
+    # As written before native dates: isoformat() strings, some without offset
+    async def seed():
+        await server.db.tasks.insert_many([
+            {
+                "task_id": f"task_legacy{index}",
+                "user_id": "user_1",
+                "title": f"Legacy {index}",
+                "category": "task",
+                "priority": "medium",
+                "status": "done",
+                "tags": [],
+                "actual_time": 0,
+                "sprint_id": None,
+                "created_at": f"2025-01-0{index + 1}T10:00:00+00:00",
+                "updated_at": f"2025-01-0{index + 1}T11:00:00",
+                "completed_at": f"2025-01-0{index + 1}T11:00:00"
+            }
+            for index in range(3)
+        ])
+        await server.db.time_entries.insert_one({
+            "entry_id": "entry_legacy",
+            "user_id": "user_1",
+            "task_id": "task_legacy0",
+            "duration": 25,
+            "type": "pomodoro",
+            "start_time": "2025-01-01T10:00:00+00:00",
+            "end_time": "2025-01-01T10:25:00+00:00",
+            "created_at": "2025-01-01T10:25:00+00:00"
+        })
+    asyncio.run(seed())
+    return api
+
+
+def test_string_dated_tasks_page_with_a_cursor(legacy_tasks):
+    response = legacy_tasks.get("/api/tasks?limit=2")
+
+    assert response.status_code == 200
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_string_dated_completed_task_can_be_updated_and_deleted(legacy_tasks):
+    assert legacy_tasks.put("/api/tasks/task_legacy0", json={"status": "todo"}).status_code == 200
+    assert legacy_tasks.delete("/api/tasks/task_legacy1").status_code == 200
+
+
+def test_stats_rebuild_counts_string_dated_documents(legacy_tasks):
+    stats = asyncio.run(server.rebuild_user_stats("user_1"))
+
+    assert stats["completed_by_day"] == {"2025-01-01": 1, "2025-01-02": 1, "2025-01-03": 1}
+    assert stats["minutes_by_day"] == {"2025-01-01": 25}
+
+
+def test_first_dashboard_read_with_string_dated_documents(legacy_tasks):
+    response = legacy_tasks.get("/api/dashboard/overview")
+
+    assert response.status_code == 200
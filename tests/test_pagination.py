@@ -0,0 +1,48 @@
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+from pymongo import ASCENDING, DESCENDING
+
+from server import cursor_filter, encode_cursor
+
+
+def test_cursor_round_trip_descending():
+    created_at = datetime(2026, 3, 1, 12, 30, tzinfo=timezone.utc)
+    cursor = encode_cursor({"created_at": created_at, "task_id": "task_abc"}, "created_at", "task_id")
+
+    assert cursor_filter(cursor, "created_at", "task_id", DESCENDING) == {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "task_id": {"$lt": "task_abc"}}
+    ]}
+
+
+def test_cursor_round_trip_ascending():
+    created_at = datetime(2026, 3, 1, tzinfo=timezone.utc)
+    cursor = encode_cursor({"created_at": created_at, "task_id": "task_abc"}, "created_at", "task_id")
+
+    conditions = cursor_filter(cursor, "created_at", "task_id", ASCENDING)["$or"]
+    assert conditions[0] == {"created_at": {"$gt": created_at}}
+    assert conditions[1]["task_id"] == {"$gt": "task_abc"}
+
+
+def test_naive_datetimes_are_read_as_utc():
+    cursor = encode_cursor({"created_at": datetime(2026, 3, 1), "entry_id": "entry_1"}, "created_at", "entry_id")
+
+    value = cursor_filter(cursor, "created_at", "entry_id")["$or"][0]["created_at"]["$lt"]
+    assert value == datetime(2026, 3, 1, tzinfo=timezone.utc)
+
+
+def test_cursor_for_another_sort_is_rejected():
+    cursor = encode_cursor({"created_at": datetime(2026, 3, 1, tzinfo=timezone.utc), "task_id": "t"}, "created_at", "task_id")
+
+    with pytest.raises(HTTPException) as error:
+        cursor_filter(cursor, "updated_at", "task_id")
+    assert error.value.status_code == 400
+
+
+@pytest.mark.parametrize("cursor", ["not-base64!", "e30", "eyJmIjoiY3JlYXRlZF9hdCJ9"])
+def test_malformed_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        cursor_filter(cursor, "created_at", "task_id")
+    assert error.value.status_code == 400
@@ -0,0 +1,80 @@
+from datetime import datetime, timezone, timedelta
+
+import pytest
+
+import server
+from server import SessionCache, User
+
+
+def make_user(user_id="user_1"):
+    return User(user_id=user_id, email=f"{user_id}@example.com", name="Test", created_at=datetime.now(timezone.utc))
+
+
+def session_expiry(days=1):
+    return datetime.now(timezone.utc) + timedelta(days=days)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_get_returns_cached_user(clock):
+    cache = SessionCache(max_size=10, ttl=60)
+    user = make_user()
+    cache.set("tok", user, session_expiry())
+
+    assert cache.get("tok") is user
+    assert cache.hits == 1
+
+
+def test_entry_expires_after_ttl(clock):
+    cache = SessionCache(max_size=10, ttl=60)
+    cache.set("tok", make_user(), session_expiry())
+
+    clock[0] += 61
+    assert cache.get("tok") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_entry_never_outlives_session(clock):
+    cache = SessionCache(max_size=10, ttl=60)
+    cache.set("tok", make_user(), datetime.now(timezone.utc) - timedelta(seconds=1))
+
+    assert cache.get("tok") is None
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SessionCache(max_size=2, ttl=60)
+    cache.set("a", make_user("user_a"), session_expiry())
+    cache.set("b", make_user("user_b"), session_expiry())
+    cache.get("a")
+    cache.set("c", make_user("user_c"), session_expiry())
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_invalidate_user_drops_every_session(clock):
+    cache = SessionCache(max_size=10, ttl=60)
+    cache.set("tok1", make_user("user_1"), session_expiry())
+    cache.set("tok2", make_user("user_1"), session_expiry())
+    cache.set("other", make_user("user_2"), session_expiry())
+
+    cache.invalidate_user("user_1")
+
+    assert cache.get("tok1") is None
+    assert cache.get("tok2") is None
+    assert cache.get("other") is not None
+    assert cache.invalidations == 2
+
+
+def test_zero_size_disables_cache(clock):
+    cache = SessionCache(max_size=0, ttl=60)
+    cache.set("tok", make_user(), session_expiry())
+
+    assert cache.get("tok") is None
@@ -0,0 +1,52 @@
+import asyncio
+
+from server import SessionExchangeCache
+
+
+class FlakyExchangeCache(SessionExchangeCache):
+    def __init__(self, outcomes):
+        super().__init__(ttl=60)
+        self.outcomes = outcomes
+        self.release = None
+
+    async def _exchange(self, session_id):
+        self.upstream_calls += 1
+        await self.release.wait()
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+
+def test_concurrent_callbacks_share_one_exchange():
+    async def scenario():
+        cache = FlakyExchangeCache([{"session_token": "tok"}])
+        cache.release = asyncio.Event()
+        callers = [asyncio.ensure_future(cache.get("sid")) for _ in range(3)]
+        await asyncio.sleep(0)
+        cache.release.set()
+        return cache, await asyncio.gather(*callers)
+
+    cache, results = asyncio.run(scenario())
+    assert results == [{"session_token": "tok"}] * 3
+    assert cache.upstream_calls == 1
+    assert cache.deduplicated == 2
+
+
+def test_failed_exchange_is_forgotten_after_its_caller_was_cancelled():
+    async def scenario():
+        cache = FlakyExchangeCache([RuntimeError("upstream down"), {"session_token": "tok"}])
+        cache.release = asyncio.Event()
+        caller = asyncio.ensure_future(cache.get("sid"))
+        await asyncio.sleep(0)
+        # The client disconnects while the exchange is still in flight
+        caller.cancel()
+        await asyncio.sleep(0)
+        cache.release.set()
+        await asyncio.sleep(0.01)
+        return cache, await cache.get("sid")
+
+    cache, result = asyncio.run(scenario())
+    assert result == {"session_token": "tok"}
+    assert cache.upstream_calls == 2
+    assert cache.stats()["size"] == 1
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from server import task_stats_delta
+
+
+def task(status="todo", category="task", completed_at=None):
+    return {"task_id": "task_1", "status": status, "category": category, "completed_at": completed_at}
+
+
+def test_created_task_counts_as_open():
+    assert task_stats_delta(None, task()) == {"open_tasks": 1, "open_by_category.task": 1}
+
+
+def test_completing_a_task_moves_it_to_the_day_it_was_completed():
+    completed_at = datetime(2026, 5, 4, 23, 30, tzinfo=timezone.utc)
+
+    assert task_stats_delta(task(), task("done", completed_at=completed_at)) == {
+        "open_tasks": -1,
+        "open_by_category.task": -1,
+        "completed_by_day.2026-05-04": 1
+    }
+
+
+def test_recategorising_an_open_task_moves_its_category_count():
+    assert task_stats_delta(task(category="bug"), task(category="study")) == {
+        "open_by_category.bug": -1,
+        "open_by_category.study": 1
+    }
+
+
+def test_unchanged_counters_are_left_out():
+    assert task_stats_delta(task(status="todo"), task(status="in_progress")) == {}
+
+
+def test_deleting_a_completed_task_removes_its_completion():
+    completed_at = datetime(2026, 5, 4, tzinfo=timezone.utc)
+
+    assert task_stats_delta(task("done", completed_at=completed_at), None) == {"completed_by_day.2026-05-04": -1}
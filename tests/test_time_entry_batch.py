@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+def batch(*items):
+    return {"entries": [
+        {"idempotency_key": key, "task_id": task_id, "duration": duration, "end_time": "2026-05-04T10:00:00Z"}
+        for key, task_id, duration in items
+    ]}
+
+
+def actual_time(api, task_id):
+    return api.get(f"/api/tasks/{task_id}").json()["actual_time"]
+
+
+def minutes_on(day):
+    stats = asyncio.run(server.db.user_stats.find_one({"user_id": "user_1"}))
+    return stats["minutes_by_day"].get(day, 0)
+
+
+@pytest.fixture
+def tasks(api):
+    task_ids = [api.post("/api/tasks", json={"title": title}).json()["task_id"] for title in ("A", "B")]
+    # The counters document is built on first read; later writes increment it
+    asyncio.run(server.rebuild_user_stats("user_1"))
+    return task_ids
+
+
+def test_replayed_batch_is_credited_once(api, tasks):
+    body = batch(("k1", tasks[0], 25), ("k2", tasks[0], 5), ("k3", "task_missing", 5))
+
+    first = api.post("/api/time-entries/batch", json=body).json()
+    second = api.post("/api/time-entries/batch", json=body).json()
+
+    assert [result["status"] for result in first["results"]] == [201, 201, 404]
+    assert first["created"] == 2
+    assert [result["status"] for result in second["results"]] == [200, 200, 404]
+    assert second["duplicates"] == 2
+    assert actual_time(api, tasks[0]) == 30
+    assert minutes_on("2026-05-04") == 30
+
+
+def test_retry_after_a_failed_increment_credits_each_task_once(api, tasks, monkeypatch):
+    collection_type = type(server.db.tasks)
+    update_one = collection_type.update_one
+    failures = [tasks[1]]
+
+    def failing_update_one(self, filter, *args, **kwargs):
+        if self.name == "tasks" and filter.get("task_id") in failures:
+            failures.remove(filter["task_id"])
+            raise RuntimeError("connection reset")
+        return update_one(self, filter, *args, **kwargs)
+
+    monkeypatch.setattr(collection_type, "update_one", failing_update_one)
+    items = [
+        server.TimeEntryBatchItem(idempotency_key="a", task_id=tasks[0], duration=10),
+        server.TimeEntryBatchItem(idempotency_key="b", task_id=tasks[1], duration=20)
+    ]
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(server.ingest_time_entries("user_1", items))
+    assert actual_time(api, tasks[0]) == 10
+    assert actual_time(api, tasks[1]) == 0
+
+    retried = asyncio.run(server.ingest_time_entries("user_1", items))
+
+    assert retried.duplicates == 2
+    assert actual_time(api, tasks[0]) == 10
+    assert actual_time(api, tasks[1]) == 20
+    day = server.stats_day_key(asyncio.run(server.db.time_entries.find_one({"idempotency_key": "a"}))["start_time"])
+    assert minutes_on(day) == 30